@@ -2,7 +2,7 @@ import streamlit as st
 import os
 import pandas as pd
 import views.global_skills as global_skills
-from uma_utils import load_data, footer_html, load_ocr_data
+from uma_utils import load_data, get_data_status, footer_html, load_ocr_data, DEBUG_PANEL, render_cache_debug_panel
 from PIL import Image
 from cm_config import CM_LIST
 from views.timeline import render_timeline_tab
@@ -74,6 +74,10 @@ except Exception as e:
 
 # 4. FILTERS (Only show if data exists)
 if data_loaded:
+    as_of, refreshing = get_data_status(sheet_url)
+    if as_of is not None:
+        st.sidebar.caption(f"🕒 Data as of {as_of:%Y-%m-%d %H:%M} UTC" + (" · refreshing…" if refreshing else ""))
+
     st.sidebar.header("⚙️ Global Filters")
     st.sidebar.warning("Adjusting filters will refresh data across all tabs other than finals.")
 
@@ -101,6 +105,9 @@ else:
     # Optional: Sidebar message when no data
     st.sidebar.info("🚫 No data available for this event yet.")
 
+if DEBUG_PANEL:
+    render_cache_debug_panel()
+
 # 5. HEADER
 st.title(f"{current_config.get('icon', '🏆')} {selected_event_name} Dashboard")
 
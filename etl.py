@@ -0,0 +1,122 @@
+"""
+Offline maintenance commands for the dashboard's local data cache (CACHE_DIR).
+
+    python etl.py prefetch            # mirror the remote finals sources of every event in CM_LIST
+    python etl.py prefetch --event "Scorpio Cup (CM7)"
+    python etl.py build               # prebuild prelims + finals artifacts for every event
+    python etl.py images              # render chart thumbnails and resized card/portrait variants
+    python etl.py tiles               # cut the Canva guide images into deep-zoom tile pyramids
+
+Artifacts are keyed by source content and PIPELINE_VERSION, so running `build` at deploy time
+means the dashboard starts from them instead of processing anything on the first page view.
+"""
+import argparse
+import sys
+import time
+
+from cm_config import CM_LIST
+import uma_utils
+
+
+def _select_events(names):
+    if not names:
+        return list(CM_LIST.items())
+    missing = [n for n in names if n not in CM_LIST]
+    if missing:
+        sys.exit(f"Unknown event(s): {', '.join(missing)}")
+    return [(n, CM_LIST[n]) for n in names]
+
+
+def cmd_prefetch(args) -> int:
+    failures = 0
+    for name, config_item in _select_events(args.event):
+        results = uma_utils.prefetch_sources(config_item)
+        if not results:
+            print(f"{name}: no remote sources")
+            continue
+        for url, error in results:
+            if error:
+                failures += 1
+                print(f"{name}: FAILED {url} ({error})")
+            else:
+                print(f"{name}: ok {url}")
+    return 1 if failures else 0
+
+
+def cmd_build(args) -> int:
+    failures = 0
+    for name, config_item in _select_events(args.event):
+        sheet_url = config_item.get('sheet_url') or ''
+        if sheet_url.strip():
+            start = time.perf_counter()
+            try:
+                df, team_df = uma_utils.build_prelims_artifacts(sheet_url)
+                print(f"{name}: prelims {len(df)} rows, {len(team_df)} teams ({time.perf_counter() - start:.1f}s)")
+            except Exception as e:
+                failures += 1
+                print(f"{name}: prelims FAILED ({e})")
+        else:
+            print(f"{name}: prelims skipped (no sheet_url)")
+
+        if config_item.get('is_multipart_parquet') or config_item.get('finals_csv'):
+            start = time.perf_counter()
+            combined_df, _, status = uma_utils.build_finals_artifacts(config_item)
+            if status == 'partial':
+                failures += 1
+            print(f"{name}: finals {status}, {len(combined_df)} rows ({time.perf_counter() - start:.1f}s)")
+        else:
+            print(f"{name}: finals skipped (not configured)")
+    return 1 if failures else 0
+
+
+def cmd_images(args) -> int:
+    start = time.perf_counter()
+    thumbs = uma_utils.build_uma_thumbnails()
+    derived = uma_utils.build_image_derivatives()
+    print(f"images: {thumbs} thumbnails, {derived} resized variants rendered ({time.perf_counter() - start:.1f}s)")
+    return 0
+
+
+def cmd_tiles(args) -> int:
+    failures = 0
+    for name, config_item in _select_events(args.event):
+        start = time.perf_counter()
+        results = uma_utils.build_guide_tiles(config_item)
+        if not results:
+            print(f"{name}: no guide images")
+            continue
+        for path, status in results:
+            if status not in ('built', 'cached'):
+                failures += 1
+                print(f"{name}: FAILED {path} ({status})")
+            else:
+                print(f"{name}: {status} {path}")
+        print(f"{name}: tiles done ({time.perf_counter() - start:.1f}s)")
+    return 1 if failures else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Dashboard data cache maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_prefetch = sub.add_parser("prefetch", help="Download remote finals sources into the local mirror")
+    p_prefetch.add_argument("--event", action="append", help="Event name from CM_LIST (repeatable, default: all)")
+    p_prefetch.set_defaults(func=cmd_prefetch)
+
+    p_build = sub.add_parser("build", help="Build and store prelims/finals artifacts")
+    p_build.add_argument("--event", action="append", help="Event name from CM_LIST (repeatable, default: all)")
+    p_build.set_defaults(func=cmd_build)
+
+    p_images = sub.add_parser("images", help="Render chart thumbnails and resized card/portrait variants")
+    p_images.set_defaults(func=cmd_images)
+
+    p_tiles = sub.add_parser("tiles", help="Build deep-zoom tile pyramids for the Canva guide images")
+    p_tiles.add_argument("--event", action="append", help="Event name from CM_LIST (repeatable, default: all)")
+    p_tiles.set_defaults(func=cmd_tiles)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,14 +8,29 @@ import html
 import ast
 from typing import Tuple, List, Optional
 import duckdb
+import pyarrow as pa
 import difflib
 import json
 import base64
-from PIL import Image, ImageDraw, ImageOps, ImageChops
+from PIL import Image, ImageDraw, ImageOps, ImageChops, features
 import io
+import hashlib
+import shutil
+import tempfile
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+import threading
+from datetime import datetime, timezone
+import requests
+from urllib.parse import urlparse
+from decouple import config
 
 # --- CONFIGURATION ---
 
+# Local directory for derived artifacts (column plans, processed frames, fetched files).
+# Safe to delete at any time; everything in it is rebuilt on demand.
+CACHE_DIR = config('UMA_CACHE_DIR', default='.cache')
+
 PLOT_CONFIG = {
     'scrollZoom': False, 
     'displayModeBar': True,
@@ -310,59 +325,118 @@ NAME_ALIASES = {
     "TM Opera O": "T.M. Opera O",
 }
 
-@st.cache_data
-def make_circle_image(base64_str):
-    if not base64_str: return None
-    
+IMAGE_MIME_TYPES = {'.png': 'image/png', '.webp': 'image/webp', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg'}
+
+# --- ATOMIC WRITES ---
+# Everything written under CACHE_DIR/STATIC_DIR goes to a uniquely named temp file next to its
+# destination and is renamed over it, so concurrent writers (first-load threads, background
+# refreshes) never see or move each other's half-written files.
+@contextmanager
+def _atomic_path(dest_path: str):
+    """Yields a temp path to write; it replaces dest_path when the block succeeds and is removed otherwise."""
+    parent = os.path.dirname(dest_path) or "."
+    os.makedirs(parent, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=f".{os.path.basename(dest_path)}.", suffix=".tmp")
+    os.close(fd)
     try:
-        # 1. Decode
-        if ',' in base64_str:
-            header, encoded = base64_str.split(',', 1)
-        else:
-            header = "data:image/png;base64"
-            encoded = base64_str
-            
-        img_data = base64.b64decode(encoded)
-        img = Image.open(io.BytesIO(img_data)).convert("RGBA")
-        
-        # 2. Prepare Super-Sampled Mask (Anti-Aliasing)
-        scale = 3
-        big_size = (img.size[0] * scale, img.size[1] * scale)
-        mask = Image.new('L', big_size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0) + big_size, fill=255)
-        
-        # Resize mask down to image size smoothly
-        mask = mask.resize(img.size, resample=Image.Resampling.LANCZOS)
-        
-        # 3. Fit Image (Center Crop)
-        # We ensure the image is square and centered before applying masks
-        img = ImageOps.fit(img, mask.size, centering=(0.5, 0.5))
-        
-        # 4. THE FIX: Combine Masks
-        # We grab the existing Alpha channel of the character
-        r, g, b, a = img.split()
-        
-        # We Multiply the existing alpha (a) by the circle mask (mask)
-        # Logic: 
-        # - If pixel is transparent in Original (Alpha=0) -> 0 * 255 = 0 (Remains Transparent)
-        # - If pixel is outside Circle (Mask=0) -> 255 * 0 = 0 (Hidden)
-        # - If pixel is Character inside Circle -> 255 * 255 = 255 (Visible)
-        final_alpha = ImageChops.multiply(a, mask)
-        
-        # Apply the combined alpha
-        img.putalpha(final_alpha)
-        
-        # 5. Output
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        return f"{header},{base64.b64encode(buffer.getvalue()).decode()}"
+        yield tmp_path
+        os.chmod(tmp_path, 0o644) # mkstemp creates 0600 files
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# --- STATIC IMAGE SERVING ---
+# With server.enableStaticServing, Streamlit serves ./static (next to dashboard.py) at app/static/.
+# Images are published there under content-hashed names, so HTML and Plotly layouts carry a short
+# URL the browser downloads once and keeps (a changed file gets a new name) instead of the whole
+# base64 payload on every rerun. UMA_STATIC_IMAGES=False falls back to inline data URIs.
+STATIC_IMAGES = config('UMA_STATIC_IMAGES', default=True, cast=bool)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL_PREFIX = "app/static"
+_STATIC_PUBLISHED = {}
+
+def _static_serving_enabled() -> bool:
+    try:
+        return STATIC_IMAGES and bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
 
-    except Exception as e:
-        # st.error(f"Error processing image: {e}") # Uncomment for debugging
-        return base64_str
+def _publish_static(file_path: str) -> str:
+    """Copies file_path into STATIC_DIR/img under a content-hashed name and returns its URL."""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    url = _STATIC_PUBLISHED.get(key)
+    if url is None:
+        with open(file_path, "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(os.path.basename(file_path))
+        slug = re.sub(r'[^A-Za-z0-9_-]+', '_', stem).strip('_')[:40] or "img"
+        name = f"{slug}.{hashlib.sha1(data).hexdigest()[:12]}{ext.lower()}"
+        dest = os.path.join(STATIC_DIR, "img", name)
+        if not os.path.exists(dest):
+            with _atomic_path(dest) as tmp_path, open(tmp_path, "wb") as f:
+                f.write(data)
+        url = _STATIC_PUBLISHED[key] = f"{STATIC_URL_PREFIX}/img/{name}"
+    return url
+
+def image_src(file_path) -> str:
+    """
+    src for an <img> tag or Plotly layout image: a static URL when static serving is on,
+    otherwise an inline data URI. Empty string if the file doesn't exist.
+    """
+    if not file_path or not os.path.exists(file_path):
+        return ""
+    if _static_serving_enabled():
+        try:
+            return _publish_static(file_path)
+        except Exception as e:
+            print(f"Error publishing static image {file_path}: {e}")
+    return get_base64_src(file_path)
+
+# --- IMAGE CACHE ---
+# Encoded images (data URIs) live in one process-wide LRU bounded by IMAGE_CACHE_MB, instead of
+# unbounded st.cache_data entries that pile up for the life of the process. Entries are keyed by
+# (path, mtime, size), so a rewritten file is simply a miss. Counters feed the debug panel.
+IMAGE_CACHE_BYTES = config('UMA_IMAGE_CACHE_MB', default=64, cast=int) * 1024 * 1024
+_IMAGE_CACHE = OrderedDict()
+_IMAGE_CACHE_STATS = {'hits': 0, 'misses': 0, 'evictions': 0, 'oversize': 0, 'bytes': 0}
+_IMAGE_CACHE_LOCK = threading.Lock()
+
+def _image_cache_get(key):
+    with _IMAGE_CACHE_LOCK:
+        value = _IMAGE_CACHE.get(key)
+        if value is None:
+            _IMAGE_CACHE_STATS['misses'] += 1
+        else:
+            _IMAGE_CACHE_STATS['hits'] += 1
+            _IMAGE_CACHE.move_to_end(key)
+        return value
+
+def _image_cache_put(key, value: str):
+    size = len(value)
+    with _IMAGE_CACHE_LOCK:
+        if size > IMAGE_CACHE_BYTES:
+            # Would evict everything else and still not fit; serve it uncached
+            _IMAGE_CACHE_STATS['oversize'] += 1
+            return
+        old = _IMAGE_CACHE.pop(key, None)
+        if old is not None:
+            _IMAGE_CACHE_STATS['bytes'] -= len(old)
+        _IMAGE_CACHE[key] = value
+        _IMAGE_CACHE_STATS['bytes'] += size
+        while _IMAGE_CACHE_STATS['bytes'] > IMAGE_CACHE_BYTES:
+            _, evicted = _IMAGE_CACHE.popitem(last=False)
+            _IMAGE_CACHE_STATS['bytes'] -= len(evicted)
+            _IMAGE_CACHE_STATS['evictions'] += 1
+
+def image_cache_stats() -> dict:
+    with _IMAGE_CACHE_LOCK:
+        return {**_IMAGE_CACHE_STATS, 'entries': len(_IMAGE_CACHE), 'budget': IMAGE_CACHE_BYTES}
 
-@st.cache_data
 def get_base64_src(file_path):
     """
     Reads an image file and converts it to a base64 string for HTML embedding.
@@ -370,10 +444,18 @@ def get_base64_src(file_path):
     if not os.path.exists(file_path):
         return ""
     try:
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        cached = _image_cache_get(key)
+        if cached is not None:
+            return cached
         with open(file_path, "rb") as f:
             data = f.read()
         encoded = base64.b64encode(data).decode()
-        return f"data:image/png;base64,{encoded}"
+        mime = IMAGE_MIME_TYPES.get(os.path.splitext(file_path)[1].lower(), "image/png")
+        src = f"data:{mime};base64,{encoded}"
+        _image_cache_put(key, src)
+        return src
     except Exception as e:
         print(f"Error encoding image {file_path}: {e}")
         return ""
@@ -382,7 +464,7 @@ def get_base64_src(file_path):
 # --- SHARED ICON HELPER ---
 def get_type_icon_src(type_name):
     """
-    Returns the Base64 SRC string for a card type icon.
+    Returns the image src (static URL or Base64) for a card type icon.
     """
     TYPE_ICON_MAP = {
         "speed": "speed_icon.png",
@@ -399,7 +481,7 @@ def get_type_icon_src(type_name):
     
     icon_file = TYPE_ICON_MAP.get(clean_type, "unknown.png")
     path = f"assets/card_type/{icon_file}"
-    return get_base64_src(path)
+    return image_src(path)
 
 def get_card_rarity_map(json_path="data/supportcard.json"):
     """
@@ -432,40 +514,51 @@ def get_card_rarity_map(json_path="data/supportcard.json"):
         return {}
     
 # --- UMA IMAGE MATCHING HELPER ---
+UMA_ASSET_DIR = "assets/umas"
+
+# Canonical name -> portrait file for assets/umas, built once from the directory listing and
+# rebuilt only when the directory's mtime changes (files added, removed or renamed).
+_UMA_MANIFEST = {'mtime': None, 'by_canonical': {}, 'files': []}
+
+def _uma_image_manifest() -> dict:
+    mtime = os.stat(UMA_ASSET_DIR).st_mtime_ns
+    if _UMA_MANIFEST['mtime'] != mtime:
+        png_files = [f for f in os.listdir(UMA_ASSET_DIR) if f.lower().endswith(".png")]
+        canonical = resolve_names(pd.Series([os.path.splitext(f)[0] for f in png_files], dtype=object))
+        by_canonical = {}
+        for f, name in zip(png_files, canonical):
+            # First file in listing order wins, like the old linear scan
+            by_canonical.setdefault(name, os.path.join(UMA_ASSET_DIR, f))
+        _UMA_MANIFEST.update(mtime=mtime, by_canonical=by_canonical, files=png_files)
+    return _UMA_MANIFEST
+
 def find_uma_image_path(target_name):
     """
-    Scans assets/umas/ for a matching image.
-    Uses smart_match_name to handle variants/aliases in filenames.
+    Finds the portrait in assets/umas/ for a canonical name.
+    Filenames are run through smart_match_name once per directory change (see _uma_image_manifest),
+    so a lookup is a dict hit.
     
     Example Matches:
     - Target: "Vodka" -> Matches: "[Wild Top Gear] Vodka.png" (via Strip)
     """
-    base_dir = "assets/umas"
-    if not os.path.exists(base_dir):
+    if not os.path.exists(UMA_ASSET_DIR):
         return None
     
-   
     try:
-        files = os.listdir(base_dir)
-        png_files = [f for f in files if f.lower().endswith(".png")]
+        manifest = _uma_image_manifest()
         
-        # --- PASS 1: SMART  MATCH ---
-        # We run every filename through smart_match_name. 
-        # If the file's  name matches our target, it's a hit.
-        for f in png_files:
-            name_no_ext = os.path.splitext(f)[0]
-            file_canonical = smart_match_name(name_no_ext)
-            
-            if file_canonical == target_name:
-                return os.path.join(base_dir, f)
+        # --- PASS 1: SMART MATCH ---
+        path = manifest['by_canonical'].get(target_name)
+        if path is not None:
+            return path
         
         # --- PASS 2: EXACT/CONTAINMENT FALLBACK ---
         # If smart match failed (maybe target isn't in canonical list?), try raw string matching.
-        for f in png_files:
+        for f in manifest['files']:
             # Check if target name is literally inside the filename
             # e.g. "Vodka" in "[Wild Top Gear] Vodka.png"
             if target_name.lower() in f.lower():
-                return os.path.join(base_dir, f)
+                return os.path.join(UMA_ASSET_DIR, f)
                 
     except Exception as e:
         print(f"Error searching for uma image: {e}")
@@ -473,13 +566,351 @@ def find_uma_image_path(target_name):
         
     return None
 
-def get_uma_base64(clean_name):
-    """Returns the base64 src for a character image."""
+def get_uma_base64(clean_name, width=None):
+    """
+    Returns the image src (static URL or Base64) for a character image.
+    Pass the displayed width (px) to get the smallest derivative that still covers it.
+    """
     path = find_uma_image_path(clean_name)
     if path:
-        return get_base64_src(path) # Re-uses your existing base64 helper
+        return image_src(derivative_image_path(path, width) if width else path)
     return None # Return None if not found
 
+# Format of every image derived from the assets (thumbnails, resized variants)
+DERIVED_IMAGE_FORMAT = "WEBP" if features.check('webp') else "PNG"
+
+def _save_image(img, dest_path: str):
+    """Atomically writes a derived image as WebP (or optimized PNG without WebP support)."""
+    with _atomic_path(dest_path) as tmp_path:
+        if DERIVED_IMAGE_FORMAT == "WEBP":
+            img.save(tmp_path, format="WEBP", quality=85)
+        else:
+            img.save(tmp_path, format="PNG", optimize=True)
+
+def _is_stale(dest_path: str, src_path: str) -> bool:
+    return not os.path.exists(dest_path) or os.path.getmtime(dest_path) < os.path.getmtime(src_path)
+
+# --- DERIVATIVE IMAGES ---
+# Downscaled WebP copies of assets/cards and assets/umas at a few widths, under
+# CACHE_DIR/derived/<kind>/<width>/. Views ask for the width they display at (already
+# doubled for high-DPI screens) and get the smallest variant that covers it, or the original
+# when no variant is large enough. Built lazily, or all at once with `python etl.py images`.
+DERIVATIVE_WIDTHS = {'cards': (100, 200), 'umas': (96, 256)}
+CARD_ASSET_DIR = "assets/cards"
+
+def _derivative_path(src_path: str, width: int) -> str:
+    kind = os.path.basename(os.path.dirname(os.path.abspath(src_path)))
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    return os.path.join(CACHE_DIR, "derived", kind, str(width), f"{stem}.{DERIVED_IMAGE_FORMAT.lower()}")
+
+def _render_derivative(src_path: str, dest_path: str, width: int):
+    img = Image.open(src_path).convert("RGBA")
+    img.thumbnail((width, width), resample=Image.Resampling.LANCZOS)
+    _save_image(img, dest_path)
+
+def derivative_image_path(src_path: str, width: int) -> str:
+    """Smallest derivative of src_path at least `width` px wide; src_path itself if none fits."""
+    kind = os.path.basename(os.path.dirname(os.path.abspath(src_path)))
+    width = next((w for w in DERIVATIVE_WIDTHS.get(kind, ()) if w >= width), None)
+    if width is None:
+        return src_path
+    dest_path = _derivative_path(src_path, width)
+    try:
+        if _is_stale(dest_path, src_path):
+            _render_derivative(src_path, dest_path, width)
+        return dest_path
+    except Exception as e:
+        print(f"Error rendering {width}px derivative of {src_path}: {e}")
+        return src_path
+
+def card_image_path(card_id, width: int = 200) -> Optional[str]:
+    """Image for a support card ID, sized for `width` px. None if the card has no asset."""
+    src_path = os.path.join(CARD_ASSET_DIR, f"{int(card_id)}.png")
+    if not os.path.exists(src_path):
+        return None
+    return derivative_image_path(src_path, width)
+
+def build_image_derivatives() -> int:
+    """Renders every configured derivative for assets/cards and assets/umas. Returns how many were (re)built."""
+    built = 0
+    for kind, widths in DERIVATIVE_WIDTHS.items():
+        src_dir = os.path.join("assets", kind)
+        if not os.path.exists(src_dir):
+            continue
+        for f in os.listdir(src_dir):
+            if not f.lower().endswith(".png"):
+                continue
+            src_path = os.path.join(src_dir, f)
+            for width in widths:
+                dest_path = _derivative_path(src_path, width)
+                if _is_stale(dest_path, src_path):
+                    _render_derivative(src_path, dest_path, width)
+                    built += 1
+    return built
+
+# --- CIRCULAR THUMBNAILS ---
+# Chart bubbles embed small pre-rendered circular thumbnails instead of masking and re-encoding
+# the full 512px portrait on every rerun. Thumbnails live under CACHE_DIR/thumbs and are
+# re-rendered whenever the source portrait is newer; `python etl.py images` prebuilds them all.
+THUMB_SIZE = 96
+
+def _render_circle_thumbnail(src_path: str, dest_path: str, size: int = THUMB_SIZE):
+    img = Image.open(src_path).convert("RGBA")
+    img = ImageOps.fit(img, (size, size), method=Image.Resampling.LANCZOS, centering=(0.5, 0.5))
+
+    # Super-sampled circle mask (anti-aliasing), multiplied into the portrait's own alpha so
+    # transparent pixels stay transparent and everything outside the circle is hidden
+    scale = 3
+    mask = Image.new('L', (size * scale, size * scale), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size * scale, size * scale), fill=255)
+    mask = mask.resize((size, size), resample=Image.Resampling.LANCZOS)
+    img.putalpha(ImageChops.multiply(img.getchannel('A'), mask))
+    _save_image(img, dest_path)
+
+def _thumbnail_path(src_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    return os.path.join(CACHE_DIR, "thumbs", str(THUMB_SIZE), f"{stem}.{DERIVED_IMAGE_FORMAT.lower()}")
+
+def uma_thumbnail_path(clean_name) -> Optional[str]:
+    """
+    Path of the circular thumbnail for a canonical name, rendering it if missing or stale.
+    Falls back to the source portrait when the thumbnail can't be rendered or written.
+    """
+    src_path = find_uma_image_path(clean_name)
+    if not src_path:
+        return None
+    dest_path = _thumbnail_path(src_path)
+    try:
+        if _is_stale(dest_path, src_path):
+            _render_circle_thumbnail(src_path, dest_path)
+        return dest_path
+    except Exception as e:
+        print(f"Error rendering thumbnail for {clean_name}: {e}")
+        return src_path
+
+def build_uma_thumbnails() -> int:
+    """Renders the thumbnail of every portrait in assets/umas. Returns how many were (re)built."""
+    if not os.path.exists(UMA_ASSET_DIR):
+        return 0
+    built = 0
+    for f in _uma_image_manifest()['files']:
+        src_path = os.path.join(UMA_ASSET_DIR, f)
+        dest_path = _thumbnail_path(src_path)
+        if _is_stale(dest_path, src_path):
+            _render_circle_thumbnail(src_path, dest_path)
+            built += 1
+    return built
+
+def get_uma_thumbnail_src(clean_name) -> Optional[str]:
+    """Image src of the circular chart thumbnail for a character."""
+    path = uma_thumbnail_path(clean_name)
+    if not path:
+        return None
+    return image_src(path) or None
+
+# --- GUIDE TILE PYRAMIDS ---
+# Canva guide exports are several thousand pixels tall, so embedding them whole means the browser
+# downloads and decodes the full image before anything shows. `python etl.py tiles` cuts every
+# guide_images entry into a DZI-style pyramid under STATIC_DIR/tiles/<slug>.<sha1>/<level>/<col>_<row>,
+# where level max_level is full resolution and each level below halves it, down to the first that
+# fits in one tile. The viewer then only fetches the tiles visible at the current zoom.
+# tiles/index.json maps each guide path (local file or URL) to its pyramid.
+GUIDE_TILE_SIZE = 512
+GUIDE_TILE_OVERLAP = 1
+GUIDE_TILE_VERSION = 1
+_GUIDE_TILE_INDEX = {'mtime': None, 'entries': {}}
+
+def _guide_tile_root() -> str:
+    return os.path.join(STATIC_DIR, "tiles")
+
+def _load_guide_tile_index() -> dict:
+    index_path = os.path.join(_guide_tile_root(), "index.json")
+    try:
+        mtime = os.stat(index_path).st_mtime_ns
+    except OSError:
+        _GUIDE_TILE_INDEX.update(mtime=None, entries={})
+        return _GUIDE_TILE_INDEX['entries']
+    if _GUIDE_TILE_INDEX['mtime'] != mtime:
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"Error reading guide tile index: {e}")
+            entries = {}
+        _GUIDE_TILE_INDEX.update(mtime=mtime, entries=entries)
+    return _GUIDE_TILE_INDEX['entries']
+
+def _render_tile_pyramid(src_path: str, dest_dir: str) -> dict:
+    """Writes every level of the pyramid plus info.json into dest_dir and returns the info."""
+    img = Image.open(src_path)
+    img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    width, height = img.size
+    max_level = max(0, (max(width, height) - 1).bit_length())
+    ext = DERIVED_IMAGE_FORMAT.lower()
+    os.makedirs(os.path.dirname(dest_dir), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(dest_dir), prefix=f".{os.path.basename(dest_dir)}.", suffix=".tmp")
+    os.chmod(tmp_dir, 0o755) # mkdtemp creates 0700 directories
+
+    try:
+        level = max_level
+        while True:
+            level_w, level_h = img.size
+            for col in range((level_w + GUIDE_TILE_SIZE - 1) // GUIDE_TILE_SIZE):
+                for row in range((level_h + GUIDE_TILE_SIZE - 1) // GUIDE_TILE_SIZE):
+                    box = (max(0, col * GUIDE_TILE_SIZE - GUIDE_TILE_OVERLAP),
+                           max(0, row * GUIDE_TILE_SIZE - GUIDE_TILE_OVERLAP),
+                           min(level_w, (col + 1) * GUIDE_TILE_SIZE + GUIDE_TILE_OVERLAP),
+                           min(level_h, (row + 1) * GUIDE_TILE_SIZE + GUIDE_TILE_OVERLAP))
+                    _save_image(img.crop(box), os.path.join(tmp_dir, str(level), f"{col}_{row}.{ext}"))
+            if max(level_w, level_h) <= GUIDE_TILE_SIZE or level == 0:
+                break
+            # Each level is downsampled from the one above it (cheaper than from full size every time)
+            img = img.resize(((level_w + 1) // 2, (level_h + 1) // 2), resample=Image.Resampling.LANCZOS)
+            level -= 1
+
+        info = {'width': width, 'height': height, 'tile_size': GUIDE_TILE_SIZE, 'overlap': GUIDE_TILE_OVERLAP,
+                'min_level': level, 'max_level': max_level, 'ext': ext}
+        with open(os.path.join(tmp_dir, "info.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    shutil.rmtree(dest_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, dest_dir)
+    except OSError:
+        # A concurrent build moved its (identical) pyramid into place first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(dest_dir, "info.json")):
+            raise
+    return info
+
+def build_guide_tiles(config_item: dict) -> List[Tuple[str, Optional[str]]]:
+    """
+    Builds the tile pyramid of every guide image of an event (remote images go through the
+    HTTP mirror). Unchanged images are skipped. Returns (path, 'built'|'cached' or error) per image.
+    """
+    root = _guide_tile_root()
+    entries = dict(_load_guide_tile_index())
+    results = []
+    for path in config_item.get('guide_images') or []:
+        try:
+            src_path = _local_source_path(path)
+            digest = hashlib.sha1(f"{GUIDE_TILE_VERSION}|{GUIDE_TILE_SIZE}|{GUIDE_TILE_OVERLAP}|{DERIVED_IMAGE_FORMAT}|".encode('utf-8'))
+            with open(src_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            stem = os.path.splitext(os.path.basename(urlparse(path).path))[0]
+            slug = re.sub(r'[^A-Za-z0-9_-]+', '_', stem).strip('_')[:40] or "guide"
+            name = f"{slug}.{digest.hexdigest()[:12]}"
+            status = 'cached'
+            if not os.path.exists(os.path.join(root, name, "info.json")):
+                _render_tile_pyramid(src_path, os.path.join(root, name))
+                status = 'built'
+            stat = os.stat(src_path)
+            entries[path] = {'dir': name, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+            results.append((path, status))
+        except Exception as e:
+            results.append((path, str(e)))
+
+    with _atomic_path(os.path.join(root, "index.json")) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1)
+
+    # Drop pyramids no guide points at anymore (superseded versions of an edited image)
+    live = {e['dir'] for e in entries.values()}
+    for entry in os.listdir(root):
+        # .tmp directories are pyramids another build is still writing
+        if os.path.isdir(os.path.join(root, entry)) and entry not in live and not entry.endswith(".tmp"):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return results
+
+def guide_tile_source(path: str) -> Optional[dict]:
+    """
+    Pyramid info (width, height, tile_size, overlap, min/max level, ext, plus the tiles' base URL)
+    for a guide image, or None when it has no up-to-date pyramid or static serving is off.
+    """
+    if not _static_serving_enabled():
+        return None
+    entry = _load_guide_tile_index().get(path)
+    if not entry:
+        return None
+    if not str(path).startswith('http'):
+        # A local guide that was re-exported since the last build shows in full until rebuilt
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != (entry['mtime_ns'], entry['size']):
+            return None
+    try:
+        with open(os.path.join(_guide_tile_root(), entry['dir'], "info.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except Exception:
+        return None
+    info['base'] = f"{STATIC_URL_PREFIX}/tiles/{entry['dir']}"
+    return info
+
+def _hybrid_match_pairs(df_manual, df_ocr) -> dict:
+    """
+    Runs the three hybrid_merge_entries passes over the join keys in DuckDB.
+    Returns {'pass', 'm_pos', 'o_pos'} arrays (row positions in df_manual / df_ocr) in the
+    order the pandas merges emit them: by pass, then manual row, then OCR row.
+
+    Keys compare with IS NOT DISTINCT FROM because pandas merges match missing keys to each other.
+    Passes 2 and 3 keep each manual winner's first OCR match, then each OCR row's first manual
+    match (drop_duplicates on the manual index, then the OCR index), so only the first OCR row of
+    every key group can ever be picked.
+    """
+    key_cols = ['join_ign', 'Clean_Uma', 'row_id', 'Clean_Style']
+    man = df_manual[key_cols].reset_index(drop=True)
+    man['m_pos'] = np.arange(len(man))
+    man['winner'] = (df_manual['Is_Winner'] == 1).to_numpy() if 'Is_Winner' in df_manual.columns else True
+    ocr = df_ocr[key_cols].reset_index(drop=True)
+    ocr['o_pos'] = np.arange(len(ocr))
+
+    query = """
+    WITH p1 AS (
+        -- Pass 1: IGN + Uma name, unknown IGNs excluded; every pair is a match
+        SELECT m.m_pos, o.o_pos
+        FROM man_keys m
+        JOIN ocr_keys o
+          ON m.join_ign IS NOT DISTINCT FROM o.join_ign AND m.Clean_Uma IS NOT DISTINCT FROM o.Clean_Uma
+        WHERE m.join_ign IS DISTINCT FROM 'unknown' AND o.join_ign IS DISTINCT FROM 'unknown'
+    ),
+    man1 AS ( SELECT * FROM man_keys ANTI JOIN p1 USING (m_pos) WHERE winner ),
+    ocr1 AS ( SELECT * FROM ocr_keys ANTI JOIN p1 USING (o_pos) ),
+    p2 AS (
+        -- Pass 2: row_id + style, manual winners only
+        SELECT min(m.m_pos) AS m_pos, f.o_pos
+        FROM man1 m
+        JOIN ( SELECT row_id, Clean_Style, min(o_pos) AS o_pos FROM ocr1 GROUP BY ALL ) f
+          ON m.row_id IS NOT DISTINCT FROM f.row_id AND m.Clean_Style IS NOT DISTINCT FROM f.Clean_Style
+        GROUP BY f.o_pos
+    ),
+    man2 AS ( SELECT * FROM man1 ANTI JOIN p2 USING (m_pos) ),
+    ocr2 AS ( SELECT * FROM ocr1 ANTI JOIN p2 USING (o_pos) ),
+    p3 AS (
+        -- Pass 3: row_id, manual winners only
+        SELECT min(m.m_pos) AS m_pos, f.o_pos
+        FROM man2 m
+        JOIN ( SELECT row_id, min(o_pos) AS o_pos FROM ocr2 GROUP BY ALL ) f
+          ON m.row_id IS NOT DISTINCT FROM f.row_id
+        GROUP BY f.o_pos
+    )
+    SELECT 1 AS pass, m_pos, o_pos FROM p1
+    UNION ALL SELECT 2, m_pos, o_pos FROM p2
+    UNION ALL SELECT 3, m_pos, o_pos FROM p3
+    ORDER BY pass, m_pos, o_pos
+    """
+    con = duckdb_cursor()
+    try:
+        con.register('man_keys', pa.Table.from_pandas(man, preserve_index=False))
+        con.register('ocr_keys', pa.Table.from_pandas(ocr, preserve_index=False))
+        result = con.execute(query).fetchnumpy()
+    finally:
+        con.close()
+    return {k: np.asarray(v, dtype=np.int64) for k, v in result.items()}
+
 def hybrid_merge_entries(df_ocr, df_manual):
     """
     Merges OCR data with Manual data using a Winner-Prioritized Strategy.
@@ -513,13 +944,6 @@ def hybrid_merge_entries(df_ocr, df_manual):
     if 'row_id' in df_ocr.columns: df_ocr['row_id'] = pd.to_numeric(df_ocr['row_id'], errors='coerce')
 
     # --- PREPARE DATA ---
-    df_manual = df_manual.copy()
-    df_ocr = df_ocr.copy()
-    
-    # Explicitly track indices to manage leftovers
-    df_manual['_m_idx'] = df_manual.index
-    df_ocr['_o_idx'] = df_ocr.index
-    
     # SUFFIXING: Protect row_id, suffix everything else
     def suffix_df(df, suffix):
         rename_map = {c: f"{c}{suffix}" for c in df.columns if c != 'row_id'}
@@ -528,88 +952,37 @@ def hybrid_merge_entries(df_ocr, df_manual):
     man_s = suffix_df(df_manual, '_manual')
     ocr_s = suffix_df(df_ocr, '_ocr')
     
-    # merge pass 1: name match (most reliable)
-    # EXCLUDE unknown IGNs so they don't Cartesian explode and scramble data!
-    man_known = man_s[man_s['join_ign_manual'] != 'unknown']
-    ocr_known = ocr_s[ocr_s['join_ign_ocr'] != 'unknown']
-
-    m1 = pd.merge(
-        man_known, ocr_known, 
-        left_on=['join_ign_manual', 'Clean_Uma_manual'], 
-        right_on=['join_ign_ocr', 'Clean_Uma_ocr'], 
-        how='inner'
-    )
-    
-    # Restore row_id which pandas automatically renames to _x and _y during merge
-    if 'row_id_x' in m1.columns:
-        m1['row_id'] = m1['row_id_y'].fillna(m1['row_id_x'])
-    elif 'row_id' not in m1.columns:
-        m1['row_id'] = pd.Series(dtype='object')
-    
-    # Leftovers 1
-    used_m = m1['_m_idx_manual'].unique()
-    used_o = m1['_o_idx_ocr'].unique()
-    man_rem1 = man_s[~man_s['_m_idx_manual'].isin(used_m)]
-    ocr_rem1 = ocr_s[~ocr_s['_o_idx_ocr'].isin(used_o)]
-    
-    # --- PASS 2: ROW ID + STYLE (Manual Winners Only) ---
-    # We filter manual leftovers to ONLY winners. 
-    # This prevents a "Runner Loser" from matching an OCR "Runner" entry.
-    
-    # Check for winner column existence (it should exist)
-    if 'Is_Winner_manual' in man_rem1.columns:
-        man_candidates_2 = man_rem1[man_rem1['Is_Winner_manual'] == 1]
-    else:
-        man_candidates_2 = man_rem1
+    # --- MATCH PASSES (DuckDB, join keys only) ---
+    pairs = _hybrid_match_pairs(df_manual, df_ocr)
+
+    def pair_rows(pass_no):
+        # Same columns as pd.merge(man, ocr) for that pass would produce
+        sel = pairs['pass'] == pass_no
+        left = man_s.iloc[pairs['m_pos'][sel]].reset_index(drop=True)
+        right = ocr_s.iloc[pairs['o_pos'][sel]].reset_index(drop=True)
+        if pass_no == 1:
+            # Pass 1 joins on names, so pandas would have renamed row_id to _x and _y
+            m = pd.concat([left.rename(columns={'row_id': 'row_id_x'}), right.rename(columns={'row_id': 'row_id_y'})], axis=1)
+            m['row_id'] = m['row_id_y'].fillna(m['row_id_x'])
+            return m
+        return pd.concat([left, right.drop(columns='row_id')], axis=1)
+
+    m1, m2, m3 = pair_rows(1), pair_rows(2), pair_rows(3)
 
-    m2 = pd.merge(
-        man_candidates_2, ocr_rem1, 
-        left_on=['row_id', 'Clean_Style_manual'], 
-        right_on=['row_id', 'Clean_Style_ocr'], 
-        how='inner'
-    )
-    
-    # Dedupe Pass 2
-    m2 = m2.drop_duplicates(subset=['_m_idx_manual'])
-    m2 = m2.drop_duplicates(subset=['_o_idx_ocr'])
-    
-    # Leftovers 2
-    used_m2 = np.concatenate([used_m, m2['_m_idx_manual'].unique()]) if not m2.empty else used_m
-    used_o2 = np.concatenate([used_o, m2['_o_idx_ocr'].unique()]) if not m2.empty else used_o
-    man_rem2 = man_s[~man_s['_m_idx_manual'].isin(used_m2)]
-    ocr_rem2 = ocr_s[~ocr_s['_o_idx_ocr'].isin(used_o2)]
-    
-    # --- PASS 3: ROW ID (Manual Winners Only) ---
-    # Matches "Aaaa's Winner" -> OCR Unknown.
-    # Manual Losers are excluded here, so they become Orphans (which is correct).
-    
-    if 'Is_Winner_manual' in man_rem2.columns:
-        man_candidates_3 = man_rem2[man_rem2['Is_Winner_manual'] == 1]
-    else:
-        man_candidates_3 = man_rem2
-        
-    m3 = pd.merge(
-        man_candidates_3, ocr_rem2, 
-        on=['row_id'], 
-        how='inner'
-    )
-    # Dedupe Pass 3
-    m3 = m3.drop_duplicates(subset=['_m_idx_manual'])
-    m3 = m3.drop_duplicates(subset=['_o_idx_ocr'])
-    
     # --- ORPHANS ---
-    used_m3 = np.concatenate([used_m2, m3['_m_idx_manual'].unique()]) if not m3.empty else used_m2
-    used_o3 = np.concatenate([used_o2, m3['_o_idx_ocr'].unique()]) if not m3.empty else used_o2
-    
     # This includes the Manual Losers that were skipped in Pass 2/3
-    man_orphans = man_s[~man_s['_m_idx_manual'].isin(used_m3)]
-    ocr_orphans = ocr_s[~ocr_s['_o_idx_ocr'].isin(used_o3)]
+    used_m = np.zeros(len(man_s), dtype=bool)
+    used_o = np.zeros(len(ocr_s), dtype=bool)
+    used_m[pairs['m_pos']] = True
+    used_o[pairs['o_pos']] = True
+    man_orphans = man_s[~used_m]
+    ocr_orphans = ocr_s[~used_o]
     
     # Combine
     merged = pd.concat([m1, m2, m3, man_orphans, ocr_orphans], ignore_index=True)
     
-    # Cleanup tracking indices
-    drop_indices = [c for c in merged.columns if '_idx_' in c or c in ['row_id_x', 'row_id_y']]
+    # Cleanup pass 1 row_id copies
+    drop_indices = [c for c in merged.columns if c in ['row_id_x', 'row_id_y']]
     merged.drop(columns=drop_indices, inplace=True, errors='ignore')
     
     # --- SMART FILL ---
@@ -760,6 +1133,163 @@ def analyze_significant_roles(df, role_col='Clean_Role', score_col='Calculated_W
         
     return sig_roles, global_avg
 
+# --- VARIANT KEYWORD INDEX ---
+# VARIANT_MAP keywords compiled once into an Aho-Corasick automaton (flattened to a DFA), so a
+# name is resolved in one pass over its characters instead of one substring test per keyword.
+# Each state records the smallest VARIANT_MAP position among the keywords ending there, which
+# keeps the old "first keyword in dict order wins" priority.
+def _build_keyword_automaton(keywords: List[str]):
+    goto, best = [{}], [len(keywords)]
+    for idx, keyword in enumerate(keywords):
+        state = 0
+        for ch in keyword:
+            if ch not in goto[state]:
+                goto.append({})
+                best.append(len(keywords))
+                goto[state][ch] = len(goto) - 1
+            state = goto[state][ch]
+        best[state] = min(best[state], idx)
+
+    # Breadth-first, so a state's failure link is always finished before the state itself
+    fail = [0] * len(goto)
+    delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        best[state] = min(best[state], best[fail[state]])
+        delta[state] = {**delta[fail[state]], **goto[state]}
+        for ch, nxt in goto[state].items():
+            fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+            queue.append(nxt)
+    return delta, best
+
+_VARIANT_KEYWORDS = list(VARIANT_MAP)
+_VARIANT_DELTA, _VARIANT_BEST = _build_keyword_automaton(_VARIANT_KEYWORDS)
+
+# NAME_ALIASES keyed by normalized alias; the first alias listed wins on a collision.
+_NORMALIZED_ALIASES = {}
+for _alias, _target in NAME_ALIASES.items():
+    _NORMALIZED_ALIASES.setdefault(_normalize_name_string(_alias), _target)
+
+def _match_variant(norm_input: str) -> Optional[str]:
+    """Canonical name for the first VARIANT_MAP keyword contained in norm_input, if any."""
+    delta, best_at = _VARIANT_DELTA, _VARIANT_BEST
+    state, best = 0, len(_VARIANT_KEYWORDS)
+    for ch in norm_input:
+        state = delta[state].get(ch, 0)
+        if best_at[state] < best:
+            best = best_at[state]
+    return VARIANT_MAP[_VARIANT_KEYWORDS[best]] if best < len(_VARIANT_KEYWORDS) else None
+
+# --- FUZZY NAME INDEX ---
+# Character counts of every canonical name, one row per name. SequenceMatcher.quick_ratio (the
+# multiset character overlap) is an upper bound on ratio(), so candidates are checked best
+# bound first and we stop as soon as no remaining bound can reach the best ratio found.
+# Unlike a trigram shortlist, this can never miss the name difflib would have picked.
+_FUZZY_INDEXES = {}
+
+def _fuzzy_index(known_names):
+    key = tuple(known_names)
+    index = _FUZZY_INDEXES.get(key)
+    if index is None:
+        names = list(dict.fromkeys(key))
+        alphabet = {ch: i for i, ch in enumerate(sorted({ch for n in names for ch in n}))}
+        counts = np.zeros((len(names), len(alphabet)), dtype=np.int32)
+        for row, n in enumerate(names):
+            for ch in n:
+                counts[row, alphabet[ch]] += 1
+        lengths = np.array([len(n) for n in names], dtype=np.int64)
+        index = _FUZZY_INDEXES[key] = (names, alphabet, counts, lengths)
+    return index
+
+def _closest_name(word: str, known_names, cutoff: float = 0.3) -> Optional[str]:
+    """Same answer as difflib.get_close_matches(word, known_names, n=1, cutoff), or None."""
+    names, alphabet, counts, lengths = _fuzzy_index(known_names)
+    if not names:
+        return None
+
+    word_counts = np.zeros(len(alphabet), dtype=np.int32)
+    for ch in word:
+        col = alphabet.get(ch)
+        if col is not None:
+            word_counts[col] += 1
+    total = lengths + len(word)
+    overlap = np.minimum(counts, word_counts).sum(axis=1)
+    bounds = np.where(total > 0, 2.0 * overlap / np.maximum(total, 1), 1.0)
+
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(word)
+    best_score, best_name = -1.0, None
+    for row in np.argsort(-bounds, kind='stable'):
+        # Equal bounds must still be scored: difflib breaks score ties on the larger name
+        if bounds[row] < cutoff or bounds[row] < best_score:
+            break
+        matcher.set_seq1(names[row])
+        score = matcher.ratio()
+        if score >= cutoff and (score > best_score or (score == best_score and names[row] > best_name)):
+            best_score, best_name = score, names[row]
+    return best_name
+
+# --- NAME RESOLUTION CACHE ---
+# raw string -> canonical name for the default ORIGINAL_UMAS list, shared by every event, load
+# and process. Persisted as an append-only JSONL log under CACHE_DIR/names whose file name hashes
+# the matching tables, so editing ORIGINAL_UMAS/VARIANT_MAP/NAME_ALIASES starts a fresh log.
+# Bump NAME_MATCH_VERSION when the matching logic itself changes.
+NAME_MATCH_VERSION = 1
+_NAME_CACHE = None
+_NAME_CACHE_FILE = None
+_NAME_CACHE_LOCK = threading.Lock()
+_NAME_TABLES_DIGEST = None
+
+def _name_tables_digest() -> str:
+    """Hash of the name matching tables and NAME_MATCH_VERSION; anything derived from Clean_Uma depends on it."""
+    global _NAME_TABLES_DIGEST
+    if _NAME_TABLES_DIGEST is None:
+        payload = json.dumps([NAME_MATCH_VERSION, ORIGINAL_UMAS, VARIANT_MAP, NAME_ALIASES], ensure_ascii=False)
+        _NAME_TABLES_DIGEST = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+    return _NAME_TABLES_DIGEST
+
+def _name_cache_path() -> str:
+    global _NAME_CACHE_FILE
+    if _NAME_CACHE_FILE is None:
+        _NAME_CACHE_FILE = os.path.join(CACHE_DIR, "names", f"{_name_tables_digest()}.jsonl")
+    return _NAME_CACHE_FILE
+
+def _load_name_cache() -> dict:
+    global _NAME_CACHE
+    if _NAME_CACHE is None:
+        cache = {}
+        try:
+            with open(_name_cache_path(), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        raw, canonical = json.loads(line)
+                        cache[raw] = canonical
+                    except ValueError:
+                        continue  # torn line from an interrupted write
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading name cache: {e}")
+        _NAME_CACHE = cache
+    return _NAME_CACHE
+
+def _cached_match_name(raw: str) -> str:
+    cache = _load_name_cache()
+    canonical = cache.get(raw)
+    if canonical is None:
+        canonical = _resolve_name(raw, ORIGINAL_UMAS)
+        with _NAME_CACHE_LOCK:
+            cache[raw] = canonical
+            try:
+                path = _name_cache_path()
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([raw, canonical], ensure_ascii=False) + "\n")
+            except Exception as e:
+                print(f"Error writing name cache: {e}")
+    return canonical
+
 def smart_match_name(name, known_names=ORIGINAL_UMAS):
     """
     Matches a raw name to the known list with Priority Logic.
@@ -767,18 +1297,34 @@ def smart_match_name(name, known_names=ORIGINAL_UMAS):
     2. Strip Titles ([...], (...))
     3. Check NAME_ALIASES (Normalized comparison for 'TM Opera' == 'T.M. Opera')
     4. Exact / Fuzzy Match
+    Results against the default ORIGINAL_UMAS list are served from the name cache.
     """
     if pd.isna(name) or str(name).strip() == "": return "Unknown Uma Name"
-    
-    raw_input = str(name).strip()
+    if known_names is ORIGINAL_UMAS:
+        return _cached_match_name(str(name))
+    return _resolve_name(str(name), known_names)
+
+def resolve_names(series: pd.Series, known_names=ORIGINAL_UMAS) -> pd.Series:
+    """
+    Vectorized smart_match_name: each distinct value is resolved once (through the name cache)
+    and mapped back by code. Missing values stay missing.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=series.index, name=series.name, dtype=object)
+    resolved = np.array([smart_match_name(name, known_names) for name in uniques] + [np.nan], dtype=object)
+    return pd.Series(resolved[codes], index=series.index, name=series.name)
+
+def _resolve_name(name: str, known_names) -> str:
+    raw_input = name.strip()
     norm_input = raw_input.lower()
 
     # --- PRIORITY 1: VARIANT MAPPING (Raw Check) ---
     # We check this FIRST before stripping brackets, because variants often have specific 
     # titles or keywords we need to detect (e.g. "Archer", "Summer").
-    for keyword, canonical in VARIANT_MAP.items():
-        if keyword in norm_input:
-            return canonical
+    variant = _match_variant(norm_input)
+    if variant is not None:
+        return variant
 
     # --- CLEANING PHASE ---
     # Remove text in brackets [], parens (), and extra spaces.
@@ -792,24 +1338,64 @@ def smart_match_name(name, known_names=ORIGINAL_UMAS):
 
     # --- PRIORITY 2: ALIAS MAP (Normalized Check) ---
     # Matches "tmopera" (Input) to "tmopera" (Alias Key) -> Returns "T.M. Opera O"
-    for alias, target in NAME_ALIASES.items():
-        if _normalize_name_string(alias) == norm_clean:
-            return target
+    if norm_clean in _NORMALIZED_ALIASES:
+        return _NORMALIZED_ALIASES[norm_clean]
 
     # --- PRIORITY 3: EXACT MATCH (Cleaned Name) ---
     if clean_input in known_names:
         return clean_input
     
     # --- PRIORITY 4: FUZZY MATCH (Cleaned Name) ---
-    matches = difflib.get_close_matches(clean_input, known_names, n=1, cutoff=0.3)
-    if matches:
-        return matches[0]
+    match = _closest_name(clean_input, known_names, cutoff=0.3)
+    if match is not None:
+        return match
         
     return "Unknown"
 def sanitize_text(text):
     if pd.isna(text): return text
     return html.escape(str(text))
 
+# Same replacements as html.escape(quote=True); '&' must go first.
+_HTML_ESCAPES = [('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;')]
+_HTML_SPECIAL = re.compile(r'[&<>"\']')
+
+def _escape_html_series(series: pd.Series) -> pd.Series:
+    """Vectorized sanitize_text: escapes each distinct value once, then scatters back by code."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    if len(uniques) == 0:
+        return series
+    uniques = pd.Index(uniques, dtype=object)
+    if all(isinstance(v, str) for v in uniques) and not any(_HTML_SPECIAL.search(v) for v in uniques):
+        return series
+
+    escaped = uniques.astype(str)
+    for char, entity in _HTML_ESCAPES:
+        escaped = escaped.str.replace(char, entity, regex=False)
+
+    # NA cells keep their original sentinel (None/NaN), like sanitize_text does.
+    values = np.where(codes == -1, series.to_numpy(dtype=object), escaped.to_numpy(dtype=object).take(codes))
+    escaped_series = pd.Series(values, index=series.index, name=series.name, dtype=object)
+    return escaped_series if series.dtype == object else escaped_series.astype(series.dtype)
+
+def sanitize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Escapes every text column of df in place; equivalent to df[col].apply(sanitize_text)."""
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        df[col] = _escape_html_series(df[col])
+    return df
+
+DEBUG_PANEL = config('UMA_DEBUG', default=False, cast=bool)
+
+def render_cache_debug_panel():
+    """Sidebar panel with the in-process cache counters (enabled with UMA_DEBUG=True)."""
+    stats = image_cache_stats()
+    with st.sidebar.expander("🛠️ Cache Debug", expanded=False):
+        lookups = stats['hits'] + stats['misses']
+        st.caption(f"Image cache: {stats['entries']} entries, "
+                   f"{stats['bytes'] / 1048576:.1f} / {stats['budget'] / 1048576:.0f} MB")
+        st.caption(f"Hits {stats['hits']} · Misses {stats['misses']} · Hit rate "
+                   f"{(stats['hits'] / lookups * 100) if lookups else 0:.0f}%")
+        st.caption(f"Evictions {stats['evictions']} · Too large to cache {stats['oversize']}")
+
 def show_description(key):
     if key in DESCRIPTIONS:
         with st.expander("ℹ️ How is this calculated?", expanded=False):
@@ -817,7 +1403,11 @@ def show_description(key):
 
 def find_column(df: pd.DataFrame, keywords: List[str], case_sensitive: bool = False) -> Optional[str]:
     if df.empty: return None
-    cols = df.columns.tolist()
+    return _find_column_in(df.columns, keywords, case_sensitive)
+
+def _find_column_in(columns, keywords: List[str], case_sensitive: bool = False) -> Optional[str]:
+    """Same lookup as find_column, but works on a bare list of headers."""
+    cols = list(columns)
     
     for col in cols:
         for key in keywords:
@@ -825,10 +1415,10 @@ def find_column(df: pd.DataFrame, keywords: List[str], case_sensitive: bool = Fa
                 if col == key: return col
             elif col.lower() == key.lower(): return col
             
-    clean_cols = df.columns.str.lower().str.replace(r'[\s_\-]', '', regex=True)
+    clean_cols = pd.Index(cols).str.lower().str.replace(r'[\s_\-]', '', regex=True)
     for i, col in enumerate(clean_cols):
         for key in keywords:
-            if key.lower() in col: return df.columns[i]
+            if key.lower() in col: return cols[i]
     return None
 
 def find_col_fuzzy(df_columns, pattern_str):
@@ -846,16 +1436,137 @@ def get_day_pattern(day):
     if day == 4: return r"(?:Day\s*4|R2D2|Round\s*2\s*Day\s*2)"
     return rf"Day\s*{day}"
 
+# --- FORM COLUMN RESOLUTION PLAN ---
+# Resolving the Google Form headers (4 days x 2 teams x 3 umas x name/style/role, plus the
+# "same team" flags) is a few hundred regex scans over every header. The answer only depends
+# on the header row, so we resolve it once per distinct header set and keep the result.
+# Bump FORM_PLAN_VERSION whenever _build_form_plan changes what it resolves.
+FORM_PLAN_VERSION = 1
+_FORM_PLAN_CACHE = {}
+
+def _header_signature(columns) -> str:
+    """Stable hash of a header row (order matters, since the first fuzzy hit wins)."""
+    payload = json.dumps([str(c) for c in columns], ensure_ascii=False)
+    return hashlib.sha1(f"v{FORM_PLAN_VERSION}|{payload}".encode('utf-8')).hexdigest()
+
+def _build_form_plan(columns) -> dict:
+    """
+    Resolves every logical column _explode_raw_form_data needs from a raw 'Wide' header row.
+    Returns a JSON-serializable dict so it can be persisted next to the other cached artifacts.
+    """
+    columns = list(columns)
+    plan = {'version': FORM_PLAN_VERSION, 'key_col': None, 'backfill': [], 'meta': {}, 'card_rename': [], 'slots': []}
+
+    # 1. Detection
+    plan['key_col'] = find_col_fuzzy(columns, rf"{get_day_pattern(1)}.*Team.*1.*Uma\s*1.*Name")
+    if not plan['key_col']:
+        return plan
+
+    def uma_cols(prefix, uma_idx):
+        return (
+            find_col_fuzzy(columns, rf"{prefix}.*Uma\s*{uma_idx}.*Name"),
+            find_col_fuzzy(columns, rf"{prefix}.*Uma\s*{uma_idx}.*(Style|Running)"),
+            find_col_fuzzy(columns, rf"{prefix}.*Uma\s*{uma_idx}.*Role"),
+        )
+
+    # 2. 'Same Team' backfill: which flag column drives which (destination, source) copies
+    for day in range(2, 5):
+        curr_day_pat = get_day_pattern(day)
+        prev_day_pat = get_day_pattern(day-1)
+        for target_team_idx in range(1, 3):
+            flag_pat = rf"(?:Was.*{curr_day_pat}.*Team(?:.*Comp)?\s*{target_team_idx}.*same.*{prev_day_pat}|Re-use.*{prev_day_pat}.*{curr_day_pat}.*Team(?:.*Comp)?\s*{target_team_idx})"
+            flag_col = find_col_fuzzy(columns, flag_pat)
+            if not flag_col:
+                continue
+
+            copies = {}
+            for source_team_idx in range(1, 3):
+                pairs = []
+                for uma_idx in range(1, 4):
+                    curr = uma_cols(rf"{curr_day_pat}.*Team(?:.*Comp)?\s*{target_team_idx}", uma_idx)
+                    prev = uma_cols(rf"{prev_day_pat}.*Team(?:.*Comp)?\s*{source_team_idx}", uma_idx)
+                    # name, style, role -> only copy when both sides exist
+                    pairs.extend([c, p] for c, p in zip(curr, prev) if c and p)
+                copies[str(source_team_idx)] = pairs
+            plan['backfill'].append({'flag_col': flag_col, 'copies': copies})
+
+    # 3. Core metadata
+    plan['meta'] = {
+        'ign': _find_column_in(columns, ['uniquedisplayname', 'ign', 'player', 'displayname']),
+        'group': _find_column_in(columns, ['cmgroup', 'bracket', 'league', 'selection', 'group']),
+        'money': _find_column_in(columns, ['spent', 'eur/usd', 'money', 'budget']),
+        'time': _find_column_in(columns, ['timestamp', 'date']),
+    }
+
+    for col in columns:
+        if "card status in account" in col.lower():
+            match = re.search(r'\[(.*?)\]', col)
+            plan['card_rename'].append([col, f"card_{match.group(1).strip()}" if match else f"card_{col[:30]}"])
+
+    # 4. Explode slots (day x team x uma)
+    for day in range(1, 5):
+        curr_day_pat = get_day_pattern(day)
+        for team_idx in range(1, 3):
+            prefix_pattern = rf"{curr_day_pat}.*Team(?:.*Comp)?\s*{team_idx}"
+            wins_col = find_col_fuzzy(columns, rf"{prefix_pattern}.*wins")
+            races_col = find_col_fuzzy(columns, rf"{prefix_pattern}.*(races|attempts)")
+            if not wins_col or not races_col: continue
+
+            for uma_idx in range(1, 4):
+                name_col, style_col, role_col = uma_cols(prefix_pattern, uma_idx)
+                if not name_col: continue
+                plan['slots'].append({
+                    'day': day, 'team': team_idx,
+                    'wins': wins_col, 'races': races_col,
+                    'name': name_col, 'style': style_col, 'role': role_col
+                })
+
+    return plan
+
+def get_form_plan(columns) -> dict:
+    """
+    Returns the column resolution plan for a header row.
+    Looked up in memory first, then on disk (CACHE_DIR/form_plans), and only built on a miss.
+    """
+    sig = _header_signature(columns)
+    plan = _FORM_PLAN_CACHE.get(sig)
+    if plan is not None:
+        return plan
+
+    plan_path = os.path.join(CACHE_DIR, "form_plans", f"{sig}.json")
+    try:
+        if os.path.exists(plan_path):
+            with open(plan_path, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+            if plan.get('version') != FORM_PLAN_VERSION:
+                plan = None
+    except Exception as e:
+        print(f"Error reading form plan {plan_path}: {e}")
+        plan = None
+
+    if plan is None:
+        plan = _build_form_plan(columns)
+        try:
+            os.makedirs(os.path.dirname(plan_path), exist_ok=True)
+            with open(plan_path, "w", encoding="utf-8") as f:
+                json.dump(plan, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error writing form plan {plan_path}: {e}")
+
+    _FORM_PLAN_CACHE[sig] = plan
+    return plan
+
 def _explode_raw_form_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Detects and transforms Raw 'Wide' format. 
     Preserves Timestamp (for run uniqueness) and Cards.
+    Column discovery comes from get_form_plan, so repeat layouts cost no regex work.
     """
     print("DEBUG: Checking if file is Raw Data...")
+    plan = get_form_plan(df.columns)
     
     # 1. Detection
-    day1_pat = get_day_pattern(1)
-    test_col = find_col_fuzzy(df.columns, rf"{day1_pat}.*Team.*1.*Uma\s*1.*Name")
+    test_col = plan['key_col']
     if test_col:
         print(f"DEBUG: Raw Data detected! Found key column: {test_col}")
     else:
@@ -866,117 +1577,83 @@ def _explode_raw_form_data(df: pd.DataFrame) -> pd.DataFrame:
 
     # 2. PRE-PROCESS: SEQUENTIAL BACKFILL
     print("DEBUG: Pre-processing 'Same Team' flags...")
-    for day in range(2, 5): 
-        curr_day_pat = get_day_pattern(day)
-        prev_day_pat = get_day_pattern(day-1)
+    for step in plan['backfill']:
+        flag_series = df[step['flag_col']].astype(str).str.lower()
         
-        # Loop through both possible destination teams (Team 1 and Team 2) for the current day
-        for target_team_idx in range(1, 3): 
-            # Look for the specific question for THIS target team
-            flag_pat = rf"(?:Was.*{curr_day_pat}.*Team(?:.*Comp)?\s*{target_team_idx}.*same.*{prev_day_pat}|Re-use.*{prev_day_pat}.*{curr_day_pat}.*Team(?:.*Comp)?\s*{target_team_idx})"
-            flag_col = find_col_fuzzy(df.columns, flag_pat)
-            
-            if flag_col:
-                flag_series = df[flag_col].astype(str).str.lower()
-                
-                # DYNAMIC ROUTING: Which team from the previous day are they copying?
-                # NEW FIX: Explicitly exclude "add new" options so we don't overwrite manual inputs!
-                is_new_team = flag_series.str.contains(r'add new|new team|new comp', na=False)
-                
-                mask_t1 = flag_series.str.contains(r'yes|true|team 1|comp 1', na=False) & ~flag_series.str.contains(r'team 2|comp 2', na=False) & ~is_new_team
-                mask_t2 = flag_series.str.contains(r'team 2|comp 2', na=False) & ~is_new_team
-                
-                for source_team_idx, team_mask in [(1, mask_t1), (2, mask_t2)]:
-                    count = team_mask.sum()
-                    if count > 0:
-                        # UNCOMMENT FOR DEBUGGING: print(f"DEBUG: Backfilling Day {day} Team {target_team_idx} from Day {day-1} Team {source_team_idx} for {count} rows.")
-                        for uma_idx in range(1, 4):
-                            # Destination: Current day, Target Team
-                            curr_prefix = rf"{curr_day_pat}.*Team(?:.*Comp)?\s*{target_team_idx}"
-                            c_name = find_col_fuzzy(df.columns, rf"{curr_prefix}.*Uma\s*{uma_idx}.*Name")
-                            c_style = find_col_fuzzy(df.columns, rf"{curr_prefix}.*Uma\s*{uma_idx}.*(Style|Running)")
-                            c_role = find_col_fuzzy(df.columns, rf"{curr_prefix}.*Uma\s*{uma_idx}.*Role")
-                            
-                            # Source: Previous day, Source Team
-                            prev_prefix = rf"{prev_day_pat}.*Team(?:.*Comp)?\s*{source_team_idx}"
-                            p_name = find_col_fuzzy(df.columns, rf"{prev_prefix}.*Uma\s*{uma_idx}.*Name")
-                            p_style = find_col_fuzzy(df.columns, rf"{prev_prefix}.*Uma\s*{uma_idx}.*(Style|Running)")
-                            p_role = find_col_fuzzy(df.columns, rf"{prev_prefix}.*Uma\s*{uma_idx}.*Role")
-                            
-                            # Execute Copy
-                            if c_name and p_name:
-                                df[c_name] = df[c_name].astype(object)
-                                df.loc[team_mask, c_name] = df.loc[team_mask, c_name].fillna(df.loc[team_mask, p_name])
-                            if c_style and p_style:
-                                df[c_style] = df[c_style].astype(object)
-                                df.loc[team_mask, c_style] = df.loc[team_mask, c_style].fillna(df.loc[team_mask, p_style])
-                            if c_role and p_role:
-                                df[c_role] = df[c_role].astype(object)
-                                df.loc[team_mask, c_role] = df.loc[team_mask, c_role].fillna(df.loc[team_mask, p_role])
+        # DYNAMIC ROUTING: Which team from the previous day are they copying?
+        # NEW FIX: Explicitly exclude "add new" options so we don't overwrite manual inputs!
+        is_new_team = flag_series.str.contains(r'add new|new team|new comp', na=False)
+        
+        mask_t1 = flag_series.str.contains(r'yes|true|team 1|comp 1', na=False) & ~flag_series.str.contains(r'team 2|comp 2', na=False) & ~is_new_team
+        mask_t2 = flag_series.str.contains(r'team 2|comp 2', na=False) & ~is_new_team
+        
+        for source_team_idx, team_mask in [(1, mask_t1), (2, mask_t2)]:
+            count = team_mask.sum()
+            if count > 0:
+                # Destination (current day, target team) <- Source (previous day, source team)
+                for c_col, p_col in step['copies'][str(source_team_idx)]:
+                    df[c_col] = df[c_col].astype(object)
+                    df.loc[team_mask, c_col] = df.loc[team_mask, c_col].fillna(df.loc[team_mask, p_col])
 
     # 3. Identify Core Metadata
-    ign_col = find_column(df, ['uniquedisplayname', 'ign', 'player', 'displayname'])
-    group_col = find_column(df, ['cmgroup', 'bracket', 'league', 'selection', 'group'])
-    money_col = find_column(df, ['spent', 'eur/usd', 'money', 'budget'])
-    time_col = find_column(df, ['timestamp', 'date'])
+    ign_col = plan['meta']['ign']
+    group_col = plan['meta']['group']
+    money_col = plan['meta']['money']
+    time_col = plan['meta']['time']
     
-    card_cols = [c for c in df.columns if "card status in account" in c.lower()]
-    card_rename_map = {}
-    for col in card_cols:
-        match = re.search(r'\[(.*?)\]', col)
-        card_rename_map[col] = f"card_{match.group(1).strip()}" if match else f"card_{col[:30]}"
-
-    # 4. Standard Explode Loop
-    processed_dfs = []
-    for day in range(1, 5):
-        curr_day_pat = get_day_pattern(day)
-        for team_idx in range(1, 3):
-            prefix_pattern = rf"{curr_day_pat}.*Team(?:.*Comp)?\s*{team_idx}"
-            
-            wins_col = find_col_fuzzy(df.columns, rf"{prefix_pattern}.*wins")
-            races_col = find_col_fuzzy(df.columns, rf"{prefix_pattern}.*(races|attempts)")
-            
-            if not wins_col or not races_col: continue
-
-            for uma_idx in range(1, 4):
-                name_col = find_col_fuzzy(df.columns, rf"{prefix_pattern}.*Uma\s*{uma_idx}.*Name")
-                style_col = find_col_fuzzy(df.columns, rf"{prefix_pattern}.*Uma\s*{uma_idx}.*(Style|Running)")
-                role_col = find_col_fuzzy(df.columns, rf"{prefix_pattern}.*Uma\s*{uma_idx}.*Role")
-                
-                if not name_col: continue
-                
-                cols_to_select = [ign_col, group_col, money_col, wins_col, races_col] + card_cols
-                if name_col: cols_to_select.append(name_col)
-                if style_col: cols_to_select.append(style_col)
-                if role_col: cols_to_select.append(role_col)
-                if time_col: cols_to_select.append(time_col)
-                
-                cols_to_select = [c for c in cols_to_select if c is not None]
-                subset = df[cols_to_select].copy()
-                
-                base_rename = {
-                    ign_col: 'ign', group_col: 'group', money_col: 'money', 
-                    name_col: 'uma', style_col: 'style', 
-                    wins_col: 'wins', races_col: 'races'
-                }
-                if time_col: base_rename[time_col] = 'Timestamp'
-                if role_col: base_rename[role_col] = 'role'
-
-                subset.rename(columns={**base_rename, **card_rename_map}, inplace=True)
-                subset['Day'] = str(day)
-                subset['Round'] = "CM" 
-                subset['Team_Comp'] = str(team_idx)
-                
-                subset = subset[subset['uma'].notna() & (subset['uma'] != '')]
-                if not subset.empty: processed_dfs.append(subset)
-
-    if not processed_dfs: return df 
-    return pd.concat(processed_dfs, ignore_index=True)
+    card_cols = [col for col, _ in plan['card_rename']]
+    card_rename_map = dict(plan['card_rename'])
+
+    # 4. Vectorized Melt
+    # Only the per-slot columns (wins/races/name/style/role) are stacked. The columns every
+    # slot shares (IGN, group, money, cards, timestamp) are gathered once per submission
+    # afterwards, instead of being copied into each of the up to 24 slot subsets.
+    shared_cols = [c for c in [ign_col, group_col, money_col] if c is not None]
+    rename_map = {ign_col: 'ign', group_col: 'group', money_col: 'money', **card_rename_map}
+    if time_col: rename_map[time_col] = 'Timestamp'
+
+    slot_frames = []
+    slot_labels = []
+    column_order = []
+    for slot in plan['slots']:
+        slot_map = {slot['wins']: 'wins', slot['races']: 'races', slot['name']: 'uma'}
+        if slot['style']: slot_map[slot['style']] = 'style'
+        if slot['role']: slot_map[slot['role']] = 'role'
+
+        names = df[slot['name']]
+        keep = np.flatnonzero((names.notna() & (names != '')).to_numpy())
+        if len(keep) == 0: continue
+
+        part = df[list(slot_map)].iloc[keep]
+        part.columns = list(slot_map.values())
+        part.index = keep
+        slot_frames.append(part)
+        slot_labels.append((str(slot['day']), str(slot['team']), len(keep)))
+
+        # Same column order a per-slot concat would produce
+        slot_cols = ([rename_map[c] for c in shared_cols] + ['wins', 'races'] +
+                     [card_rename_map[c] for c in card_cols] +
+                     [c for c in ['uma', 'style', 'role'] if c in part.columns] +
+                     (['Timestamp'] if time_col else []) + ['Day', 'Round', 'Team_Comp'])
+        column_order.extend(c for c in slot_cols if c not in column_order)
+
+    if not slot_frames: return df 
+    long_df = pd.concat(slot_frames)
+
+    # Join the submission-level columns back by source row
+    submission_cols = shared_cols + card_cols + ([time_col] if time_col else [])
+    submission = df[submission_cols].iloc[long_df.index.to_numpy()].rename(columns=rename_map)
+    submission.index = long_df.index
+
+    exploded = pd.concat([submission, long_df], axis=1).reset_index(drop=True)
+    lengths = [n for _, _, n in slot_labels]
+    exploded['Day'] = np.repeat(np.array([d for d, _, _ in slot_labels], dtype=object), lengths)
+    exploded['Round'] = "CM"
+    exploded['Team_Comp'] = np.repeat(np.array([t for _, t, _ in slot_labels], dtype=object), lengths)
+    return exploded[column_order]
 
 def _clean_raw_data(df: pd.DataFrame) -> pd.DataFrame:
-    string_cols = df.select_dtypes(include=['object']).columns
-    for col in string_cols: 
-        df[col] = df[col].apply(sanitize_text)
+    sanitize_frame(df)
 
     # Backup Card Normalization
     raw_card_cols = [c for c in df.columns if "card status in account" in c.lower() and not c.startswith("card_")]
@@ -1073,9 +1750,7 @@ def _clean_raw_data(df: pd.DataFrame) -> pd.DataFrame:
     else: df['Sort_Money'] = 0.0
 
     if col_map['uma']: df['Clean_Uma'] = parse_uma_details(df[col_map['uma']])
-    unique_names = df['Clean_Uma'].dropna().unique()
-    name_map = {name: smart_match_name(name) for name in unique_names}
-    df['Clean_Uma'] = df['Clean_Uma'].map(name_map).fillna("Unknown")
+    df['Clean_Uma'] = resolve_names(df['Clean_Uma']).fillna("Unknown")
 
     if col_map['races']: df['Clean_Races'] = extract_races_count(df[col_map['races']])
     else: df['Clean_Races'] = 1
@@ -1154,67 +1829,447 @@ def _process_teams(df: pd.DataFrame) -> pd.DataFrame:
         
     return team_df
 
-@st.cache_data(ttl=3600)
+def _match_and_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """Row-local stage of the prelims pipeline: cleaning, timestamp parsing and name matching."""
+    df = _clean_raw_data(df)
+
+    if 'Clean_Timestamp' in df.columns:
+        # Convert timestamp to datetime for accurate sorting
+        df['Clean_Timestamp'] = pd.to_datetime(df['Clean_Timestamp'], errors='coerce')
+
+    if 'Clean_Uma' in df.columns:
+        df['Clean_Uma'] = resolve_names(df['Clean_Uma'])
+    return df
+
+def _dedupe_long_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Keeps the best submission per player/round/day/uma and anonymizes non-top players."""
+    # Sort by timestamp (if available) or Races/Wins to keep the best data
+    sort_cols = ['Clean_Races', 'Clean_Wins']
+    if 'Clean_Timestamp' in df.columns:
+        sort_cols.insert(0, 'Clean_Timestamp')
+        
+    df = df.sort_values(by=sort_cols, ascending=False)
+
+    # AGGRESSIVE DEDUPLICATION
+    # We assume one submission per player per round/day is the valid one.
+    # We MUST isolate anonymous runs before dropping, otherwise they all get deleted!
+    
+    df['Clean_IGN_Lower'] = df['Clean_IGN'].astype(str).str.lower().str.strip()
+    is_anon = df['Clean_IGN_Lower'].isin(['unknown', 'anonymous', 'anonymous trainer'])
+    
+    df_known = df[~is_anon]
+    df_anon = df[is_anon]
+    
+    # Deduplicate known players aggressively
+    subset_cols = ['Clean_IGN', 'Round', 'Day', 'Clean_Uma']
+    df_known = df_known.drop_duplicates(subset=subset_cols, keep='first')
+    
+    # Deduplicate anonymous players strictly by row_id
+    subset_anon = ['row_id', 'Clean_Uma']
+    if 'row_id' in df_anon.columns:
+        df_anon = df_anon.drop_duplicates(subset=subset_anon, keep='first')
+    
+    # Recombine and clean up
+    df = pd.concat([df_known, df_anon], ignore_index=True)
+    df = df.drop(columns=['Clean_IGN_Lower'], errors='ignore')
+
+    return anonymize_players(df)
+
+def _derive_teams(df: pd.DataFrame) -> pd.DataFrame:
+    team_df = _process_teams(df)
+    
+    # --- DOUBLE CHECK: Deduplicate Teams ---
+    # Ensure we don't have multiple team entries for the same player/round/day in the final team_df
+    return team_df.drop_duplicates(subset=['Clean_IGN', 'Round', 'Day'], keep='first')
+
+# --- DTYPE COMPACTION ---
+# Cleaned text columns repeat a handful of values (styles, groups, LB statuses) thousands of times
+COMPACT_TEXT_COLS = ['Clean_Uma', 'Clean_Style', 'Clean_Group', 'Clean_Role', 'Round', 'Day', 'Team_Comp', 'Original_Spent']
+COMPACT_INT_COLS = ['Clean_Races', 'Clean_Wins']
+
+def _compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Stores low-cardinality text as category and whole-number stats as the smallest int type."""
+    if df.empty: return df
+    df = df.copy()
+    for col in df.columns:
+        if col not in COMPACT_TEXT_COLS and not col.startswith('card_'): continue
+        values = df[col].dropna()
+        # Team rows keep lists in Clean_Uma/Clean_Style; only plain text columns are converted
+        if pd.api.types.infer_dtype(values, skipna=True) != 'string': continue
+        if values.nunique() <= len(df) // 2:
+            df[col] = df[col].astype('category')
+    for col in COMPACT_INT_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+# --- PERSISTENT CACHE HELPERS ---
+# Frames are stored as Parquet under CACHE_DIR. Caching is best-effort: any failure to read
+# or write is logged and the caller simply rebuilds.
+# Bump PIPELINE_VERSION whenever a change to the cleaning/merge code changes its output,
+# so artifacts built by older code are never served. Edits to the name tables
+# (ORIGINAL_UMAS/VARIANT_MAP/NAME_ALIASES) are picked up through _name_tables_digest.
+PIPELINE_VERSION = 3
+
+def _write_frame(df: pd.DataFrame, path: str) -> bool:
+    """Persists a frame as Parquet. Caching is best-effort, so failures are only logged."""
+    try:
+        # Parquet has no second resolution and reads plain object text back as str, so
+        # remember those dtypes and restore them on read
+        out = df.copy(deep=False)
+        out.attrs = {'restore_dtypes': {str(c): str(t) for c, t in df.dtypes.items() if t == object or str(t).startswith('datetime64')}}
+        with _atomic_path(path) as tmp_path:
+            out.to_parquet(tmp_path)
+        return True
+    except Exception as e:
+        print(f"Error writing cache frame {path}: {e}")
+        return False
+
+def _read_frame(path: str) -> Optional[pd.DataFrame]:
+    try:
+        if os.path.exists(path):
+            df = pd.read_parquet(path)
+            for col, dtype in df.attrs.pop('restore_dtypes', {}).items():
+                if col in df.columns: df[col] = df[col].astype(dtype)
+            # Parquet hands list columns (team lists, Skill_List) back as numpy arrays
+            for col in df.columns[df.dtypes == object]:
+                sample = df[col].dropna()
+                if not sample.empty and isinstance(sample.iloc[0], np.ndarray):
+                    df[col] = df[col].map(lambda v: v.tolist() if isinstance(v, np.ndarray) else np.nan)
+            return df
+    except Exception as e:
+        print(f"Error reading cache frame {path}: {e}")
+    return None
+
+# --- REMOTE SOURCES ---
+# Every http(s) source is mirrored under CACHE_DIR/http together with its ETag/Last-Modified.
+# Refreshes send a conditional GET, so an unchanged file costs a 304 instead of a download,
+# and the unchanged bytes then hit the content-keyed artifact cache instead of being parsed.
+def _http_cache_paths(url: str) -> Tuple[str, str]:
+    base = os.path.join(CACHE_DIR, "http", hashlib.sha1(url.encode('utf-8')).hexdigest()[:16])
+    name = os.path.basename(urlparse(url).path) or "body"
+    return os.path.join(base, name), os.path.join(base, "meta.json")
+
+# GitHub URLs pinned to a full commit sha (.../raw/<sha>/... or raw.githubusercontent.com/<owner>/<repo>/<sha>/...)
+# can never change, so once mirrored they are served from disk without any request.
+_PINNED_URL = re.compile(r'^https?://(?:github\.com/[^/]+/[^/]+/(?:raw|blob)|raw\.githubusercontent\.com/[^/]+/[^/]+)/[0-9a-f]{40}/')
+
+def _is_pinned_url(url: str) -> bool:
+    return bool(_PINNED_URL.match(url))
+
+def _fetch_remote(url: str) -> str:
+    """Brings the local mirror of url up to date and returns its path. Raises on HTTP errors."""
+    body_path, meta_path = _http_cache_paths(url)
+    if _is_pinned_url(url) and os.path.exists(body_path):
+        return body_path
+
+    meta = {}
+    if os.path.exists(body_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception:
+            meta = {}
+
+    headers = {}
+    if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+
+    resp = requests.get(url, headers=headers, timeout=60)
+    if resp.status_code == 304 and headers:
+        return body_path
+    resp.raise_for_status()
+
+    with _atomic_path(body_path) as tmp_path, open(tmp_path, "wb") as f:
+        f.write(resp.content)
+    try:
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({'url': url, 'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}, f)
+    except Exception as e:
+        print(f"Error writing fetch metadata for {url}: {e}")
+    return body_path
+
+def _local_source_path(path: str) -> str:
+    """Local file path for a source: URLs are fetched (conditionally) into the mirror first."""
+    return _fetch_remote(path) if str(path).startswith('http') else path
+
+def _remote_sources(config_item: dict) -> List[str]:
+    """Every remote file the finals pipeline reads for an event."""
+    paths = list((config_item.get('finals_parts') or {}).values()) + [config_item.get('parquet_file')]
+    return [p for p in paths if p and str(p).startswith('http')]
+
+def prefetch_sources(config_item: dict) -> List[Tuple[str, Optional[str]]]:
+    """Mirrors every remote source of an event. Returns (url, error or None) per source."""
+    results = []
+    for url in _remote_sources(config_item):
+        try:
+            _fetch_remote(url)
+            results.append((url, None))
+        except Exception as e:
+            results.append((url, str(e)))
+    return results
+
+def _read_source_bytes(path: str) -> bytes:
+    """Raw bytes of a local file or http(s) URL."""
+    with open(_local_source_path(path), "rb") as f:
+        return f.read()
+
+def _content_key(chunks) -> str:
+    """Cache key for a pipeline run: hash of every source plus PIPELINE_VERSION and the name tables."""
+    h = hashlib.sha256(f"pipeline-v{PIPELINE_VERSION}|names-{_name_tables_digest()}".encode('utf-8'))
+    for chunk in chunks:
+        h.update(hashlib.sha256(chunk).digest())
+    return h.hexdigest()[:32]
+
+def _artifact_dir(kind: str, name: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')[:40]
+    return os.path.join(CACHE_DIR, "artifacts", kind, f"{slug}_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}")
+
+def _load_artifacts(kind: str, name: str, key: str, parts: List[str]) -> Optional[dict]:
+    base = os.path.join(_artifact_dir(kind, name), key)
+    frames = {part: _read_frame(os.path.join(base, f"{part}.parquet")) for part in parts}
+    if any(f is None for f in frames.values()):
+        return None
+    return frames
+
+def _latest_artifacts(kind: str, name: str, parts: List[str]) -> Optional[Tuple[dict, datetime]]:
+    """
+    The most recent artifact set for a source built by this PIPELINE_VERSION and name tables, whatever its key,
+    plus the time it was built. Used to start from prebuilt data before the source is checked.
+    """
+    parent = _artifact_dir(kind, name)
+    candidates = []
+    try:
+        for entry in os.listdir(parent):
+            with open(os.path.join(parent, entry, "manifest.json"), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get('pipeline_version') == PIPELINE_VERSION and manifest.get('name_tables') == _name_tables_digest():
+                candidates.append((manifest.get('built_at', ''), entry))
+    except Exception:
+        pass
+    for built_at, entry in sorted(candidates, reverse=True):
+        frames = _load_artifacts(kind, name, entry, parts)
+        if frames is not None:
+            return frames, datetime.fromisoformat(built_at)
+    return None
+
+def _store_artifacts(kind: str, name: str, key: str, frames: dict):
+    """Writes a complete artifact set, then drops the older sets for the same source."""
+    parent = _artifact_dir(kind, name)
+    base = os.path.join(parent, key)
+    if not all(_write_frame(df, os.path.join(base, f"{part}.parquet")) for part, df in frames.items()):
+        shutil.rmtree(base, ignore_errors=True)
+        return
+    try:
+        with open(os.path.join(base, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({'source': name, 'pipeline_version': PIPELINE_VERSION, 'name_tables': _name_tables_digest(),
+                       'built_at': datetime.now(timezone.utc).isoformat(), 'parts': list(frames)}, f)
+    except Exception as e:
+        print(f"Error writing artifact manifest for {name}: {e}")
+    for entry in os.listdir(parent):
+        if entry != key:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+# --- INCREMENTAL INGEST ---
+# Form responses are append-only, so a refresh only has to push the new rows through
+# explode/clean/name matching. We persist the row-local long table plus a watermark
+# (row count, last Timestamp and a digest of every processed Timestamp) per sheet.
+# Editing a response rewrites its Timestamp, which breaks the digest and forces a full rebuild.
+INCREMENTAL_INGEST = config('UMA_INCREMENTAL_INGEST', default=True, cast=bool)
+INGEST_VERSION = 1
+
+def _ingest_dir(sheet_url: str) -> str:
+    return os.path.join(CACHE_DIR, "ingest", hashlib.sha1(sheet_url.encode('utf-8')).hexdigest()[:16])
+
+def _timestamp_digest(series: pd.Series) -> str:
+    return hashlib.sha1("\n".join(map(str, series.tolist())).encode('utf-8')).hexdigest()
+
+def _load_ingest_state(sheet_url: str, raw: pd.DataFrame, time_col: str):
+    """
+    Returns (state, long_df, df, team_df) if the stored ingest is a valid prefix of raw,
+    otherwise None (first load, new form layout, edited/deleted rows, version bump,
+    edited name tables).
+    """
+    base = _ingest_dir(sheet_url)
+    try:
+        with open(os.path.join(base, "state.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception:
+        return None
+
+    n = state.get('row_count', 0)
+    # The stored rows were cleaned and name-matched by whatever code built them
+    if (state.get('version') != INGEST_VERSION or state.get('pipeline_version') != PIPELINE_VERSION
+            or state.get('name_tables') != _name_tables_digest()
+            or state.get('header') != _header_signature(raw.columns) or n <= 0 or len(raw) < n):
+        return None
+
+    prefix = raw[time_col].iloc[:n]
+    if str(prefix.iloc[-1]) != state.get('last_timestamp') or _timestamp_digest(prefix) != state.get('timestamp_digest'):
+        return None
+
+    frames = [_read_frame(os.path.join(base, f"{name}.parquet")) for name in ("long", "df", "team")]
+    if any(f is None for f in frames):
+        return None
+    return (state, *frames)
+
+def _save_ingest_state(sheet_url: str, raw: pd.DataFrame, time_col: str, long_df, df, team_df):
+    base = _ingest_dir(sheet_url)
+    for name, frame in (("long", long_df), ("df", df), ("team", team_df)):
+        if not _write_frame(frame, os.path.join(base, f"{name}.parquet")):
+            return
+    state = {
+        'version': INGEST_VERSION,
+        'pipeline_version': PIPELINE_VERSION,
+        'name_tables': _name_tables_digest(),
+        'header': _header_signature(raw.columns),
+        'row_count': len(raw),
+        'last_timestamp': str(raw[time_col].iloc[-1]) if len(raw) else None,
+        'timestamp_digest': _timestamp_digest(raw[time_col]),
+    }
+    try:
+        with open(os.path.join(base, "state.json"), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    except Exception as e:
+        print(f"Error writing ingest state for {sheet_url}: {e}")
+
+def _ingest_incremental(raw: pd.DataFrame, sheet_url: str):
+    """
+    Incremental variant of the prelims pipeline. Returns (df, team_df), or None when the
+    sheet can't be treated as append-only (not a raw form export, or no Timestamp column).
+    """
+    plan = get_form_plan(raw.columns)
+    time_col = plan['meta'].get('time')
+    if not plan['key_col'] or not time_col or raw.empty:
+        return None
+
+    stored = _load_ingest_state(sheet_url, raw, time_col)
+    if stored is None:
+        long_df = _match_and_clean(_explode_raw_form_data(raw))
+        df = _dedupe_long_table(long_df.copy())
+        team_df = _derive_teams(df)
+        _save_ingest_state(sheet_url, raw, time_col, long_df, df, team_df)
+        return df, team_df
+
+    state, old_long, old_df, old_team = stored
+    new_rows = raw.iloc[state['row_count']:]
+    if new_rows.empty:
+        return old_df, old_team
+
+    print(f"DEBUG: Incremental ingest of {len(new_rows)} new rows for {sheet_url}")
+    exploded = _explode_raw_form_data(new_rows)
+    if 'uma' not in exploded.columns:
+        # Nothing to explode in the new rows (e.g. blank submissions), only move the watermark
+        _save_ingest_state(sheet_url, raw, time_col, old_long, old_df, old_team)
+        return old_df, old_team
+
+    chunk = _match_and_clean(exploded)
+    long_df = pd.concat([old_long, chunk], ignore_index=True)
+    df = _dedupe_long_table(long_df.copy())
+
+    # Only trainers with new rows, or whose anonymized display name flipped, need new teams.
+    old_display = old_team.drop_duplicates('Clean_IGN').set_index('Clean_IGN')['Display_IGN'] if not old_team.empty else pd.Series(dtype=object)
+    new_display = df.drop_duplicates('Clean_IGN').set_index('Clean_IGN')['Display_IGN']
+    flipped = old_display.index[old_display.ne(new_display.reindex(old_display.index))]
+    affected = set(chunk['Clean_IGN']) | set(flipped)
+
+    fresh_teams = _derive_teams(df[df['Clean_IGN'].isin(affected)])
+    team_df = pd.concat([old_team[~old_team['Clean_IGN'].isin(affected)], fresh_teams], ignore_index=True)
+    team_df = team_df.sort_values('Clean_IGN', kind='stable').reset_index(drop=True)
+
+    _save_ingest_state(sheet_url, raw, time_col, long_df, df, team_df)
+    return df, team_df
+
+def build_prelims_artifacts(sheet_url: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Downloads the sheet and runs the full prelims pipeline (or reuses its artifacts). Raises on failure."""
+    # Same bytes + same PIPELINE_VERSION -> reuse the frames built last time (even across restarts)
+    source = _read_source_bytes(sheet_url)
+    key = _content_key([source])
+    cached = _load_artifacts("prelims", sheet_url, key, ["df", "team"])
+    if cached is not None:
+        return cached["df"], cached["team"]
+
+    raw = pd.read_csv(io.BytesIO(source))
+
+    result = _ingest_incremental(raw, sheet_url) if INCREMENTAL_INGEST else None
+    if result is None:
+        df = _match_and_clean(_explode_raw_form_data(raw))
+        df = _dedupe_long_table(df)
+        team_df = _derive_teams(df)
+    else:
+        df, team_df = result
+
+    df, team_df = _compact_dtypes(df), _compact_dtypes(team_df)
+    _store_artifacts("prelims", sheet_url, key, {"df": df, "team": team_df})
+    return df, team_df
+
+# --- STALE-WHILE-REVALIDATE ---
+# The last good (df, team_df) per sheet is kept in process memory. Once it is older than
+# PRELIMS_TTL, visitors keep getting it while a worker thread rebuilds; the new snapshot
+# replaces the old one in a single assignment under the lock. Only the very first load of a
+# sheet blocks on the download.
+PRELIMS_TTL = config('UMA_PRELIMS_TTL', default=3600, cast=int)
+_PRELIMS_SNAPSHOTS = {}
+_PRELIMS_REFRESHING = set()
+_PRELIMS_LOCK = threading.Lock()
+
+def _refresh_prelims(sheet_url: str):
+    try:
+        fetched_at = datetime.now(timezone.utc)
+        df, team_df = build_prelims_artifacts(sheet_url)
+        with _PRELIMS_LOCK:
+            _PRELIMS_SNAPSHOTS[sheet_url] = (df, team_df, fetched_at)
+    except Exception as e:
+        # Keep serving the previous snapshot; the next stale read retries
+        print(f"Error refreshing {sheet_url} in background: {e}")
+    finally:
+        with _PRELIMS_LOCK:
+            _PRELIMS_REFRESHING.discard(sheet_url)
+
+def get_data_status(sheet_url: str) -> Tuple[Optional[datetime], bool]:
+    """(time the served snapshot was fetched, whether a background refresh is running)."""
+    with _PRELIMS_LOCK:
+        snapshot = _PRELIMS_SNAPSHOTS.get(sheet_url)
+        return (snapshot[2] if snapshot else None), sheet_url in _PRELIMS_REFRESHING
+
 def load_data(sheet_url: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
     if sheet_url == None or sheet_url.strip() == "":
         return pd.DataFrame(), pd.DataFrame()
-    else:
-        try:
-            df = pd.read_csv(sheet_url)
-            df = _explode_raw_form_data(df)
-            df = _clean_raw_data(df)
-
-            # Sort by timestamp (if available) or Races/Wins to keep the best data
-            sort_cols = ['Clean_Races', 'Clean_Wins']
-            if 'Clean_Timestamp' in df.columns:
-                # Convert timestamp to datetime for accurate sorting
-                df['Clean_Timestamp'] = pd.to_datetime(df['Clean_Timestamp'], errors='coerce')
-                sort_cols.insert(0, 'Clean_Timestamp')
-            
-                
-            df = df.sort_values(by=sort_cols, ascending=False)
-            
-            if 'Clean_Uma' in df.columns:
-                unique_names = df['Clean_Uma'].dropna().unique()
-                name_map = {name: smart_match_name(name, ORIGINAL_UMAS) for name in unique_names}
-                df['Clean_Uma'] = df['Clean_Uma'].map(name_map)
-
-            # AGGRESSIVE DEDUPLICATION
-            # We assume one submission per player per round/day is the valid one.
-            # We MUST isolate anonymous runs before dropping, otherwise they all get deleted!
-            
-            df['Clean_IGN_Lower'] = df['Clean_IGN'].astype(str).str.lower().str.strip()
-            is_anon = df['Clean_IGN_Lower'].isin(['unknown', 'anonymous', 'anonymous trainer'])
-            
-            df_known = df[~is_anon]
-            df_anon = df[is_anon]
-            
-            # Deduplicate known players aggressively
-            subset_cols = ['Clean_IGN', 'Round', 'Day', 'Clean_Uma']
-            df_known = df_known.drop_duplicates(subset=subset_cols, keep='first')
-            
-            # Deduplicate anonymous players strictly by row_id
-            subset_anon = ['row_id', 'Clean_Uma']
-            if 'row_id' in df_anon.columns:
-                df_anon = df_anon.drop_duplicates(subset=subset_anon, keep='first')
-            
-            # Recombine and clean up
-            df = pd.concat([df_known, df_anon], ignore_index=True)
-            df = df.drop(columns=['Clean_IGN_Lower'], errors='ignore')
 
-            df = anonymize_players(df)
-            team_df = _process_teams(df)
-            
-            # --- DOUBLE CHECK: Deduplicate Teams ---
-            # Ensure we don't have multiple team entries for the same player/round/day in the final team_df
-            team_df = team_df.drop_duplicates(subset=['Clean_IGN', 'Round', 'Day'], keep='first')
-            
-            return df, team_df
+    with _PRELIMS_LOCK:
+        snapshot = _PRELIMS_SNAPSHOTS.get(sheet_url)
+        if snapshot is not None:
+            is_stale = (datetime.now(timezone.utc) - snapshot[2]).total_seconds() > PRELIMS_TTL
+            if is_stale and sheet_url not in _PRELIMS_REFRESHING:
+                _PRELIMS_REFRESHING.add(sheet_url)
+                threading.Thread(target=_refresh_prelims, args=(sheet_url,), daemon=True).start()
+
+    if snapshot is None:
+        # Start from prebuilt artifacts (etl.py build, or a previous process) and revalidate
+        # the sheet in the background instead of blocking on it
+        prebuilt = _latest_artifacts("prelims", sheet_url, ["df", "team"])
+        if prebuilt is not None:
+            frames, built_at = prebuilt
+            with _PRELIMS_LOCK:
+                snapshot = _PRELIMS_SNAPSHOTS.setdefault(sheet_url, (frames["df"], frames["team"], built_at))
+                if sheet_url not in _PRELIMS_REFRESHING:
+                    _PRELIMS_REFRESHING.add(sheet_url)
+                    threading.Thread(target=_refresh_prelims, args=(sheet_url,), daemon=True).start()
+            return snapshot[0].copy(), snapshot[1].copy()
 
+        try:
+            fetched_at = datetime.now(timezone.utc)
+            df, team_df = build_prelims_artifacts(sheet_url)
         except Exception as e:
             print(f"Error in load_data: {e}") 
             st.error(f"Data Error: {e}")
             return pd.DataFrame(), pd.DataFrame()
+        with _PRELIMS_LOCK:
+            # A concurrent first load may have finished meanwhile; either result is current
+            snapshot = _PRELIMS_SNAPSHOTS.setdefault(sheet_url, (df, team_df, fetched_at))
+
+    # Callers filter and add columns freely, so never hand out the shared frames
+    return snapshot[0].copy(), snapshot[1].copy()
 
 def clean_currency_numeric(series):
     return (series.astype(str)
@@ -1302,10 +2357,8 @@ def load_ocr_data(parquet_file):
         if not is_url and not os.path.exists(parquet_file):
             return pd.DataFrame()
             
-        df = pd.read_parquet(parquet_file)
-        string_cols = df.select_dtypes(include=['object']).columns
-        for col in string_cols:
-            df[col] = df[col].apply(sanitize_text)
+        df = pd.read_parquet(_local_source_path(parquet_file))
+        sanitize_frame(df)
         
         df.dropna(subset=['name'], inplace=True)
         
@@ -1330,8 +2383,172 @@ def load_ocr_data(parquet_file):
         st.error(f"Error loading Parquet: {e}")
         return pd.DataFrame()
 
-@st.cache_data
-def load_finals_data(config_item: dict):
+# --- DUCKDB CONNECTIONS ---
+# One DuckDB connection per database for the whole process, opened on first use. Callers take
+# their own cursor (a separate connection to the same database, safe to use from another thread),
+# so concurrent sessions loading different CMs neither share the global default connection nor
+# repeat any setup. Parquet schemas are memoized per file version.
+_DUCKDB_CONNECTIONS = {}
+_DUCKDB_LOCK = threading.Lock()
+_PARQUET_COLUMNS = {}
+
+def duckdb_cursor(path: str = ":memory:"):
+    """A fresh cursor on the shared connection to `path` (in-memory by default). Close it when done."""
+    with _DUCKDB_LOCK:
+        con = _DUCKDB_CONNECTIONS.get(path)
+        if con is None:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            con = _DUCKDB_CONNECTIONS[path] = duckdb.connect(path)
+        return con.cursor()
+
+def _parquet_columns(path: str) -> List[str]:
+    """Column names of a local Parquet file, read once per (path, mtime, size)."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    cols = _PARQUET_COLUMNS.get(key)
+    if cols is None:
+        con = duckdb_cursor()
+        try:
+            cols = [row[0] for row in con.execute(f"DESCRIBE SELECT * FROM read_parquet('{path}') LIMIT 0").fetchall()]
+        finally:
+            con.close()
+        _PARQUET_COLUMNS[key] = cols
+    return cols
+
+# Exactly the characters str.isspace() accepts (RE2's \s and DuckDB's trim() only cover ASCII),
+# so OCR text padded with \xa0 or full-width spaces strips the same way as in Python
+_SQL_WHITESPACE = r"[\pZ\x{9}-\x{d}\x{1c}-\x{1f}\x{85}]"
+
+def _sql_strip(expr: str) -> str:
+    """SQL equivalent of str(x).strip() for a VARCHAR expression."""
+    return f"regexp_replace({expr}, '^{_SQL_WHITESPACE}+|{_SQL_WHITESPACE}+$', '', 'g')"
+
+def _first_match(mask: np.ndarray) -> np.ndarray:
+    """Index of the first True per row of a 2-D mask, -1 where a row has none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+def _explode_manual_finals(raw_csv: pd.DataFrame, ign_col, league_col, winner_type_col,
+                           winner_name_col, winner_style_col, result_col) -> pd.DataFrame:
+    """
+    Turns the manual finals form (one row per submission) into one row per team Uma,
+    plus the winning Uma of an opponent win. Works on whole columns: the three
+    'Finals - Team Comp - Uma k' slots are stacked into (rows x 3) arrays and the
+    winner slot is picked with array masks instead of walking the rows.
+    """
+    n = len(raw_csv)
+    unknown = np.full(n, "Unknown", dtype=object)
+
+    def text(col, default):
+        # str() of the raw cell, the way a per-row lookup would read it
+        if col is None or col not in raw_csv.columns:
+            return np.full(n, default, dtype=object)
+        return raw_csv[col].map(str).to_numpy(dtype=object)
+
+    # Matches CSV Row Number perfectly
+    row_ids = np.array([f"manual_{int(str(i)) + 2}" for i in raw_csv.index], dtype=object)
+    ign = text(ign_col, "Unknown")
+    group = raw_csv['A or B Finals?'].to_numpy(dtype=object) if 'A or B Finals?' in raw_csv.columns else unknown
+    league = np.full(n, "Graded", dtype=object)
+    if league_col:
+        league[pd.Series(text(league_col, 'Graded')).str.lower().str.contains('open', regex=False).to_numpy()] = "Open"
+
+    w_type = pd.Series(text(winner_type_col, ''), dtype=object).str.lower()
+    is_opponent = w_type.str.contains('opponent', regex=False).to_numpy()
+    is_explicit_own = (w_type.str.contains('own', regex=False) | w_type.str.contains('1st', regex=False)).to_numpy()
+    result_str = pd.Series(text(result_col, ''), dtype=object).str.lower().str.strip()
+    is_result_1st = result_str.isin(['1st', '1', 'first', 'winner', 'win']).to_numpy()
+
+    w_name = unknown.copy()
+    if winner_name_col:
+        has_name = raw_csv[winner_name_col].notna().to_numpy()
+        w_name[has_name] = resolve_names(raw_csv[winner_name_col]).to_numpy(dtype=object)[has_name]
+    w_style = raw_csv[winner_style_col].map(_normalize_style).to_numpy(dtype=object) if winner_style_col else unknown.copy()
+
+    # --- MELT THE THREE TEAM SLOTS ---
+    present = np.zeros((n, 3), dtype=bool)
+    names = np.full((n, 3), np.nan, dtype=object)
+    styles = np.full((n, 3), "Unknown", dtype=object)
+    for k in range(3):
+        uma_col = f"Finals - Team Comp - Uma {k + 1} - Name"
+        style_col = f"Finals - Team Comp - Uma {k + 1} - Running Style"
+        if uma_col not in raw_csv.columns: continue
+        raw_names = raw_csv[uma_col]
+        present[:, k] = (raw_names.notna() & (raw_names.map(str).str.strip() != "")).to_numpy()
+        names[:, k] = resolve_names(raw_names).to_numpy(dtype=object)
+        if style_col in raw_csv.columns:
+            styles[:, k] = raw_csv[style_col].map(_normalize_style).to_numpy(dtype=object)
+        else:
+            styles[:, k] = _normalize_style('Unknown')
+
+    known_name = w_name != "Unknown"
+    name_match = present & (names == w_name[:, None]) & known_name[:, None]
+
+    # --- AUTO-FILL WINNER STYLE IF MISSING ---
+    # First team member named as the winner that declares a style
+    fill_from = _first_match(name_match & (styles != "Unknown"))
+    fill = known_name & np.isin(w_style, ["nan", "Unknown"]) & (fill_from >= 0)
+    rows = np.arange(n)
+    w_style[fill] = styles[rows[fill], fill_from[fill]]
+
+    # --- DETERMINE WINNER INDEX ---
+    # 1. Explicit "Own" win: by name, else by style when the winner's name is unknown
+    # 2. Implied "1st": by name only
+    # No default-to-slot-0 fallback; Pass 3 (Hybrid Merge) handles it if OCR knows the winner.
+    by_name = _first_match(name_match)
+    by_style = _first_match(present & (styles == w_style[:, None]))
+    winner_idx = np.full(n, -1)
+    own = is_explicit_own
+    winner_idx[own] = np.where((by_name[own] == -1) & ~known_name[own] & (w_style[own] != "Unknown"),
+                               by_style[own], by_name[own])
+    implied = ~own & ~is_opponent & is_result_1st
+    winner_idx[implied] = by_name[implied]
+
+    # --- PROCESS TEAM UMAS (1-3) ---
+    t_row, t_slot = np.nonzero(present)
+    is_win = (t_slot == winner_idx[t_row]).astype(int)
+    override = is_win.astype(bool) & ~np.isin(w_style[t_row], ["Unknown", "Nan", "None", "nan", ""])
+    team = {
+        'row_id': row_ids[t_row],
+        'uma_slot': t_slot,
+        'Clean_Uma': names[t_row, t_slot],
+        'Clean_Style': np.where(override, w_style[t_row], styles[t_row, t_slot]),
+        'Clean_IGN': ign[t_row],
+        'Finals_Group': group[t_row],
+        'League': league[t_row],
+        'Source': np.full(len(t_row), 'Manual', dtype=object),
+        'Is_Winner': is_win,
+        'Result': np.where(is_win == 1, 1.0, np.nan),
+        'Skill_Count': np.zeros(len(t_row), dtype=int),
+        'is_user': is_win, # If not 1st (Winner), assume Opponent (is_user=0)
+    }
+
+    # --- PROCESS OPPONENT WINNER ---
+    o_row = np.flatnonzero(is_opponent & known_name)
+    opponent = {
+        'row_id': row_ids[o_row],
+        'uma_slot': np.full(len(o_row), -1),
+        'Clean_Uma': w_name[o_row],
+        'Clean_Style': w_style[o_row],
+        'Clean_IGN': np.array([f"{i} (Opponent)" for i in ign[o_row]], dtype=object),
+        'Finals_Group': group[o_row],
+        'League': league[o_row],
+        'Source': np.full(len(o_row), 'Manual_Opponent', dtype=object),
+        'Is_Winner': np.ones(len(o_row), dtype=int),
+        'Result': np.ones(len(o_row)),
+        'Skill_Count': np.zeros(len(o_row), dtype=int),
+        'is_user': np.zeros(len(o_row), dtype=int),
+    }
+
+    # Each submission's team rows, then its opponent winner
+    order = np.argsort(np.concatenate([t_row * 4 + t_slot, o_row * 4 + 3]), kind='stable')
+    if len(order) == 0:
+        return pd.DataFrame()
+    return pd.DataFrame({col: np.concatenate([team[col], opponent[col]])[order].tolist() for col in team})
+
+def _build_finals_data(config_item: dict):
+    """Runs the finals pipeline. The third return value flags a partial load that must not be cached."""
+    had_errors = False
     combined_df = pd.DataFrame()
     df_auto = pd.DataFrame()
     df_csv_exploded = pd.DataFrame()
@@ -1346,16 +2563,15 @@ def load_finals_data(config_item: dict):
         
         if not p_stat or not p_pod or not p_deck:
             st.info("🚧 We are still finalizing data collection for this Champion's Meeting. Please check back later!")
-            return pd.DataFrame(), {}
+            return pd.DataFrame(), {}, True
         
         try:
-            duckdb.sql("INSTALL httpfs;")
-            duckdb.sql("LOAD httpfs;")
+            # DuckDB reads the local mirrors, so remote parts are only re-downloaded when they change
+            p_stat, p_pod, p_deck = (_local_source_path(p) for p in (p_stat, p_pod, p_deck))
 
             def get_cte_info(path):
                 try:
-                    df_schema = duckdb.sql(f"DESCRIBE SELECT * FROM read_parquet('{path}') LIMIT 0").df()
-                    cols = df_schema['column_name'].tolist()
+                    cols = _parquet_columns(path)
                     lower_cols = [c.lower() for c in cols]
                     sel_stmt = "*"
                     if 'row' in lower_cols and 'row_id' not in lower_cols: sel_stmt = "*, row AS row_id"
@@ -1392,7 +2608,24 @@ def load_finals_data(config_item: dict):
             select_parts.append(safe_col('p', 'placement', 'Result', cols_pod))
             select_parts.append(safe_col('p', 'post', 'Post', cols_pod))
             select_parts.append(safe_col('p', 'time', 'Run_Time_Str', cols_pod))
-            select_parts.append(safe_col('p', 'style', 'Clean_Style', cols_pod))
+
+            # Running style in its standard long form (_normalize_style), 'Unknown' when missing
+            pod_style = next((c for c in cols_pod if c.lower() == 'style'), None)
+            if pod_style:
+                style_str = _sql_strip(f"CAST(p.\"{pod_style}\" AS VARCHAR)")
+                select_parts.append(f"""
+                CASE
+                    WHEN p."{pod_style}" IS NULL THEN 'Unknown'
+                    WHEN lower({style_str}) = 'late' THEN 'Late Surger'
+                    WHEN lower({style_str}) = 'pace' THEN 'Pace Chaser'
+                    WHEN lower({style_str}) = 'front' THEN 'Front Runner'
+                    WHEN lower({style_str}) = 'end' THEN 'End Closer'
+                    WHEN lower({style_str}) IN ('runaway', 'oonige', 'great escape') THEN 'Runaway'
+                    ELSE {style_str}
+                END as Clean_Style
+                """)
+            else:
+                select_parts.append("'Unknown' as Clean_Style")
 
             select_parts.append(safe_col('s', 'skills', 'Skill_List', cols_stat))
             select_parts.append(safe_col('s', 'skill_count', 'Skill_Count', cols_stat))
@@ -1460,10 +2693,10 @@ def load_finals_data(config_item: dict):
             s_check = f"CASE WHEN CAST(s.\"{s_is_user_col}\" AS VARCHAR) ILIKE 'true' OR TRY_CAST(s.\"{s_is_user_col}\" AS INTEGER) = 1 THEN 1 ELSE 0 END" if s_is_user_col else "0"
 
             is_user_logic = f"""
-            CASE 
+            CAST(CASE 
                 WHEN ({p_check} = 1 OR {s_check} = 1) THEN 1
                 ELSE 0
-            END as is_user
+            END AS BIGINT) as is_user
             """
             select_parts.append(is_user_logic)
 
@@ -1500,39 +2733,53 @@ def load_finals_data(config_item: dict):
                 deck_name = next(c for c in cols_deck if c.lower() == 'name')
                 join_d += f" AND LOWER(REPLACE(p.\"{pod_name}\", ' ', '')) = LOWER(REPLACE(d.\"{deck_name}\", ' ', ''))"
 
+            # Run time 'M:SS.ms' (or plain seconds) -> seconds, NULL when unparseable (_parse_run_time_to_seconds)
+            pod_time = next((c for c in cols_pod if c.lower() == 'time'), None)
+            if pod_time:
+                time_raw = f"CAST(p.\"{pod_time}\" AS VARCHAR)"
+                time_str = f"NULLIF({_sql_strip(time_raw)}, '')"
+                select_parts.append(f"""
+                CASE
+                    WHEN len(string_split({time_str}, ':')) = 2
+                        THEN TRY_CAST({_sql_strip(f"split_part({time_str}, ':', 1)")} AS DOUBLE) * 60
+                           + TRY_CAST({_sql_strip(f"split_part({time_str}, ':', 2)")} AS DOUBLE)
+                    ELSE TRY_CAST({time_str} AS DOUBLE)
+                END as Run_Time
+                """)
+            else:
+                select_parts.append("CAST(NULL AS DOUBLE) as Run_Time")
+
             select_string = ",\n                ".join(select_parts)
             
             query = f"""
             WITH stat_data AS ( SELECT {sel_stat} FROM read_parquet('{p_stat}') ),
                  pod_data AS ( SELECT {sel_pod} FROM read_parquet('{p_pod}') ),
-                 deck_data AS ( SELECT {sel_deck} FROM read_parquet('{p_deck}') )
-            SELECT 
-                {select_string},
-                'Automated' as Source
-            FROM pod_data p
-            LEFT JOIN stat_data s ON {join_s}
-            LEFT JOIN deck_data d ON {join_d}
+                 deck_data AS ( SELECT {sel_deck} FROM read_parquet('{p_deck}') ),
+                 joined AS (
+                    SELECT 
+                        {select_string},
+                        'Automated' as Source
+                    FROM pod_data p
+                    LEFT JOIN stat_data s ON {join_s}
+                    LEFT JOIN deck_data d ON {join_d}
+                 )
+            SELECT
+                * EXCLUDE (Run_Time) REPLACE ('ocr_' || CAST(row_id AS VARCHAR) as row_id),
+                Run_Time,
+                'A Finals' as Finals_Group,
+                League_Inferred as League
+            FROM joined
             """
             
-            df_auto = duckdb.query(query).to_df()
+            con = duckdb_cursor()
+            try:
+                df_auto = con.execute(query).df()
+            finally:
+                con.close()
             
-            if df_auto.empty:
-                df_auto['Finals_Group'] = pd.Series(dtype='object')
-                df_auto['League'] = pd.Series(dtype='object')
-                df_auto['uma_slot'] = pd.Series(dtype='int')
-            else:
-                if 'row_id' in df_auto.columns:
-                    df_auto['row_id'] = "ocr_" + df_auto['row_id'].astype(str)
-                if 'Run_Time_Str' in df_auto.columns:
-                    df_auto['Run_Time'] = df_auto['Run_Time_Str'].apply(_parse_run_time_to_seconds)
-                
-                if 'Clean_Style' in df_auto.columns:
-                    df_auto['Clean_Style'] = df_auto['Clean_Style'].apply(lambda x: _normalize_style(x) if pd.notna(x) else "Unknown")
-                
+            if not df_auto.empty:
                 if 'Clean_Uma' in df_auto.columns:
-                    unique_names = df_auto['Clean_Uma'].dropna().unique()
-                    name_map = {name: smart_match_name(name, ORIGINAL_UMAS) for name in unique_names}
-                    df_auto['Clean_Uma'] = df_auto['Clean_Uma'].map(name_map)
+                    df_auto['Clean_Uma'] = resolve_names(df_auto['Clean_Uma'])
                 
                 def safe_parse_skills(x):
                     if isinstance(x, (np.ndarray, list)): return list(x)
@@ -1547,24 +2794,13 @@ def load_finals_data(config_item: dict):
                     df_auto['Skill_List'] = df_auto['Skill_List'].apply(safe_parse_skills)
                 else:
                     df_auto['Skill_List'] = np.empty((len(df_auto), 0)).tolist()
-                
-                if 'is_user' in df_auto.columns:
-                     df_auto['is_user'] = pd.to_numeric(df_auto['is_user'], errors='coerce').fillna(0).astype(int)
 
-                def resolve_metadata(row):
-                    res_group = "A Finals" 
-                    res_league = row.get('League_Inferred', 'Unknown')
-                    return pd.Series([res_group, res_league])
-
-                meta_cols = df_auto.apply(resolve_metadata, axis=1)
-                df_auto['Finals_Group'] = meta_cols[0]
-                df_auto['League'] = meta_cols[1]
-                
-                if 'row_id' in df_auto.columns:
-                    df_auto['uma_slot'] = df_auto.groupby('row_id').cumcount()
+            # uma_slot numbers entries within a race in join output order
+            df_auto['uma_slot'] = df_auto.groupby('row_id').cumcount()
 
         except Exception as e:
             st.error(f"Error loading DuckDB Parquets: {e}")
+            had_errors = True
     else:
         pass
     csv_path = config_item.get('finals_csv', None)
@@ -1660,142 +2896,11 @@ def load_finals_data(config_item: dict):
                 print(f"CRITICAL ERROR: Detected column '{winner_style_col}' is NOT in dataframe columns!")
             # ----------------------------
 
-            processed_rows = []
-            
-            # --- FIX: USE ROW INDEX TO PREVENT DRIFT ---
-            for row_idx, row in raw_csv.iterrows():
-                row_id = f"manual_{int(str(row_idx)) + 2}"# Matches CSV Row Number perfectly
-                
-                if ign_col:
-                    ign_raw = str(row.get(ign_col, 'Unknown'))
-                else:
-                    ign_raw = "Unknown"
-                group = row.get('A or B Finals?', 'Unknown')
-                league = "Graded"
-                if league_col:
-                    raw_league = str(row.get(league_col, 'Graded'))
-                    league = "Open" if "open" in raw_league.lower() else "Graded"
-                
-                w_type = str(row.get(winner_type_col, '')).lower()
-                w_name_raw = row.get(winner_name_col)
-                w_style_raw = row.get(winner_style_col)
-                
-                w_clean_name = "Unknown"
-                if pd.notna(w_name_raw): w_clean_name = smart_match_name(str(w_name_raw), ORIGINAL_UMAS)
-                
-                w_clean_style = "Unknown"
-                if pd.notna(w_style_raw): w_clean_style = _normalize_style(w_style_raw)
-
-                row_result_str = str(row.get(result_col, '')).lower().strip()
-                is_result_1st = row_result_str in ['1st', '1', 'first', 'winner', 'win']
-
-                team_data = []
-                for k in range(1, 4):
-                    uma_col = f"Finals - Team Comp - Uma {k} - Name"
-                    style_col = f"Finals - Team Comp - Uma {k} - Running Style"
-                    if uma_col in raw_csv.columns:
-                        uname = row.get(uma_col)
-                        ustyle = row.get(style_col, 'Unknown')
-                        if pd.notna(uname) and str(uname).strip() != "":
-                            team_data.append({
-                                'clean_name': smart_match_name(str(uname), ORIGINAL_UMAS),
-                                'clean_style': _normalize_style(ustyle)
-                            })
-                        else:
-                            team_data.append(None)
-                    else:
-                        team_data.append(None)
-
-                # --- AUTO-FILL WINNER STYLE IF MISSING ---
-                if w_clean_name != "Unknown" and (w_clean_style == "nan" or w_clean_style == "Unknown"):
-                    for member in team_data:
-                        if member and member['clean_name'] == w_clean_name:
-                            # Found the winner in the team list! Use that declared style.
-                            if member['clean_style'] != "Unknown":
-                                w_clean_style = member['clean_style']
-                                # UNCOMMENT FOR DEBUGGING: print(f"DEBUG: Auto-filled style for {w_clean_name}: {w_clean_style}")
-                                break
-
-                # --- DETERMINE WINNER INDEX ---
-                winner_idx = -1
-                
-                # 1. Explicit "Own" win Check
-                is_explicit_own = ('own' in w_type) or ('1st' in w_type)
-                if is_explicit_own:
-                    # Match by Name
-                    for k, u in enumerate(team_data):
-                        if u and u['clean_name'] == w_clean_name and w_clean_name != "Unknown":
-                            winner_idx = k; break
-                    
-                    # Match by Style (Fallback)
-                    if winner_idx == -1 and w_clean_name == "Unknown" and w_clean_style != "Unknown":
-                        for k, u in enumerate(team_data):
-                            if u and u['clean_style'] == w_clean_style:
-                                winner_idx = k; break
-                    
-                    # FIX: REMOVED DEFAULT TO 0 FALLBACK.
-                    # If user says "Own" but we can't find who, we don't guess. 
-                    # Pass 3 (Hybrid Merge) will handle it if OCR knows the winner.
-
-                # 2. Implied "1st" Check
-                elif 'opponent' not in w_type and is_result_1st:
-                    if w_clean_name != "Unknown":
-                        for k, u in enumerate(team_data):
-                            if u and u['clean_name'] == w_clean_name:
-                                winner_idx = k; break
-                    
-                    # FIX: REMOVED DEFAULT TO 0 FALLBACK.
-                            
-                # --- PROCESS TEAM UMAS (1-3) ---
-                for k in range(3):
-                    u_data = team_data[k]
-                    if u_data:
-                        is_win = 1 if k == winner_idx else 0
-                        result = 1 if k == winner_idx else np.nan
-                        
-                        final_style = u_data['clean_style']
-                        Unknown_List = ["Unknown", "Nan", "None", "nan", ""]
-                        if is_win and (w_clean_style not in Unknown_List):
-                            final_style = w_clean_style
-
-                        # If not 1st (Winner), assume Opponent (is_user=0). 
-                        # Otherwise User (is_user=1).
-                        is_user_val = 1 if is_win else 0
-                        
-                        processed_rows.append({
-                            'row_id': row_id,
-                            'uma_slot': k,
-                            'Clean_Uma': u_data['clean_name'], 
-                            'Clean_Style': final_style, 
-                            'Clean_IGN': ign_raw,
-                            'Finals_Group': group, 
-                            'League': league, 
-                            'Source': 'Manual',
-                            'Is_Winner': is_win, 
-                            'Result': result, 
-                            'Skill_Count': 0,
-                            'is_user': is_user_val # <--- APPLIED HERE
-                        })
-
-                # --- PROCESS OPPONENT WINNER ---
-                if 'opponent' in w_type and w_clean_name != "Unknown":
-                    processed_rows.append({
-                        'row_id': row_id,
-                        'uma_slot': -1,
-                        'Clean_Uma': w_clean_name,
-                        'Clean_Style': w_clean_style,
-                        'Clean_IGN': f"{ign_raw} (Opponent)", 
-                        'Finals_Group': group,
-                        'League': league,
-                        'Source': 'Manual_Opponent',
-                        'Is_Winner': 1,
-                        'Result': 1,
-                        'Skill_Count': 0,
-                        'is_user': 0 
-                    })
-
-            if processed_rows: df_csv_exploded = pd.DataFrame(processed_rows)
-        except Exception as e: st.error(f"Error loading CSV: {e}")
+            df_csv_exploded = _explode_manual_finals(raw_csv, ign_col, league_col, winner_type_col,
+                                                     winner_name_col, winner_style_col, result_col)
+        except Exception as e:
+            st.error(f"Error loading CSV: {e}")
+            had_errors = True
 
     # --- HYBRID MERGE (Manual + OCR) ---
     combined_df = hybrid_merge_entries(df_auto, df_csv_exploded)
@@ -1804,8 +2909,221 @@ def load_finals_data(config_item: dict):
         'manual_csv': df_csv_exploded
     }
     
+    return combined_df, raw_dfs, had_errors
+
+FINALS_CONFIG_KEYS = ['is_multipart_parquet', 'finals_parts', 'finals_csv', 'aptitude_dist', 'aptitude_surf']
+
+def _finals_content_key(config_item: dict) -> str:
+    """Hashes the config fields the finals pipeline reads plus the bytes of its local sources."""
+    settings = {k: config_item.get(k) for k in FINALS_CONFIG_KEYS}
+    chunks = [json.dumps(settings, sort_keys=True, default=str).encode('utf-8')]
+    sources = list((config_item.get('finals_parts') or {}).values()) + [config_item.get('finals_csv')]
+    for path in sources:
+        # Remote sources are commit-pinned URLs, so the URL in the settings already identifies them
+        if not path or str(path).startswith('http'): continue
+        chunks.append(_read_source_bytes(path) if os.path.exists(path) else b"")
+    return _content_key(chunks)
+
+def build_finals_artifacts(config_item: dict):
+    """
+    Loads the finals frames from the artifact cache, or runs the pipeline and stores them.
+    Returns (combined_df, raw_dfs, status) with status one of 'cached', 'built' or 'partial'
+    (a run that hit an error; never cached).
+    """
+    name = str(config_item.get('id', ''))
+    parts = ['merged', 'automated_parquet', 'manual_csv']
+    try:
+        key = _finals_content_key(config_item)
+        cached = _load_artifacts("finals", name, key, parts)
+        if cached is not None:
+            _materialize_finals(name, key, cached['merged'])
+            return cached['merged'], {'automated_parquet': cached['automated_parquet'], 'manual_csv': cached['manual_csv']}, 'cached'
+    except Exception as e:
+        print(f"Error checking finals cache: {e}")
+        key = None
+
+    combined_df, raw_dfs, had_errors = _build_finals_data(config_item)
+    if key and not had_errors and raw_dfs:
+        _store_artifacts("finals", name, key, {'merged': combined_df, **raw_dfs})
+        _materialize_finals(name, key, combined_df)
+        return combined_df, raw_dfs, 'built'
+    return combined_df, raw_dfs, 'partial'
+
+@st.cache_data
+def load_finals_data(config_item: dict):
+    combined_df, raw_dfs, _ = build_finals_artifacts(config_item)
     return combined_df, raw_dfs
 
+# --- FINALS CATALOG ---
+# The merged finals frame of each event is also materialized into one DuckDB file
+# (CACHE_DIR/finals.duckdb). Views ask it narrow questions ("Graded A Finals rows", "leagues of
+# this CM") instead of unpickling the whole frame from st.cache_data and filtering it in pandas on
+# every rerun. finals_catalog records the content key each table was built from, so a table is only
+# rewritten when its sources change. Tables are stored sorted by FINALS_CLUSTER_COLS so DuckDB's
+# per-row-group min/max pruning skips non-matching rows; ART indexes are deliberately not used,
+# since DuckDB then fetches matches row by row, which measured ~5x slower than a scan here.
+FINALS_DB_PATH = os.path.join(CACHE_DIR, "finals.duckdb")
+FINALS_CLUSTER_COLS = ['League', 'Finals_Group', 'Clean_Uma']
+_FINALS_DB_READY = False
+_FINALS_TABLES = {}  # event id -> (table, column dtypes), or None when it has no table this process
+
+def _finals_db():
+    """A cursor on the finals catalog for the calling thread (creates the catalog table on first use)."""
+    global _FINALS_DB_READY
+    con = duckdb_cursor(FINALS_DB_PATH)
+    if not _FINALS_DB_READY:
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS finals_catalog (
+                event VARCHAR PRIMARY KEY, table_name VARCHAR, content_key VARCHAR,
+                pipeline_version INTEGER, built_at TIMESTAMP, row_count BIGINT, dtypes VARCHAR
+            )
+        """)
+        _FINALS_DB_READY = True
+    return con
+
+def _catalog_entry(con, name: str, key: str):
+    """(table, dtypes) of the event's catalog table if it was built from `key`, else None."""
+    row = con.execute("SELECT table_name, dtypes FROM finals_catalog WHERE event = ? AND content_key = ? AND pipeline_version = ?",
+                      [name, key, PIPELINE_VERSION]).fetchone()
+    return (row[0], json.loads(row[1])) if row else None
+
+def _materialize_finals(name: str, key: str, df: pd.DataFrame):
+    """Writes df as the catalog table of event `name` unless it is already built from `key`."""
+    if df.empty or len(df.columns) == 0:
+        _FINALS_TABLES[name] = None
+        return
+    table = "finals_" + (re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower() or "event")
+    dtypes = {str(c): str(t) for c, t in df.dtypes.items()}
+    try:
+        con = _finals_db()
+        try:
+            if _catalog_entry(con, name, key) is None:
+                # finals_row keeps the frame's own index, so query results line up with pandas filtering
+                frame = df.reset_index(drop=True)
+                frame.insert(0, 'finals_row', df.index.to_numpy(dtype=np.int64))
+                con.register('finals_frame', frame)
+                con.execute("BEGIN TRANSACTION")
+                con.execute(f'DROP TABLE IF EXISTS "{table}"')
+                cluster = ", ".join(f'"{c}"' for c in FINALS_CLUSTER_COLS + ['finals_row'] if c in frame.columns)
+                con.execute(f'CREATE TABLE "{table}" AS SELECT * FROM finals_frame ORDER BY {cluster}')
+                con.execute("INSERT OR REPLACE INTO finals_catalog VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [name, table, key, PIPELINE_VERSION, datetime.now(timezone.utc).replace(tzinfo=None),
+                             len(frame), json.dumps(dtypes)])
+                con.execute("COMMIT")
+                con.unregister('finals_frame')
+        finally:
+            con.close()
+        _FINALS_TABLES[name] = (table, dtypes)
+    except Exception as e:
+        print(f"Error materializing finals table for {name}: {e}")
+        _FINALS_TABLES[name] = None
+
+def _finals_table(config_item: dict):
+    """(table, dtypes) of an event's catalog table, building it on first use; None if unavailable."""
+    name = str(config_item.get('id', ''))
+    if name not in _FINALS_TABLES:
+        # A table built from the current sources is used as is, without loading the artifacts
+        try:
+            con = _finals_db()
+            try:
+                entry = _catalog_entry(con, name, _finals_content_key(config_item))
+            finally:
+                con.close()
+            if entry is not None:
+                _FINALS_TABLES[name] = entry
+                return entry
+        except Exception as e:
+            print(f"Error reading finals catalog for {name}: {e}")
+        build_finals_artifacts(config_item)
+        # Partial builds aren't materialized; serve them from load_finals_data like before
+        _FINALS_TABLES.setdefault(name, None)
+    return _FINALS_TABLES[name]
+
+_NULLABLE_INTS = {pa.int64(): pd.Int64Dtype(), pa.int32(): pd.Int32Dtype()}
+
+def _frame_from_arrow(result, dtypes: dict) -> pd.DataFrame:
+    """
+    Catalog query result -> the frame pandas filtering would have produced: recorded dtypes,
+    list columns as lists, finals_row as the index. Fetching Arrow and converting column by column
+    is several times faster than .df() plus a DataFrame-wide astype on these wide tables.
+    """
+    cols = {}
+    for name, col in zip(result.column_names, result.columns):
+        want = dtypes.get(name)
+        series = col.to_pandas(types_mapper=_NULLABLE_INTS.get if want in ('Int64', 'Int32') else None)
+        if pa.types.is_list(col.type):
+            series = series.map(lambda v: v.tolist() if isinstance(v, np.ndarray) else np.nan)
+        if want and str(series.dtype) != want:
+            series = series.astype(want)
+        cols[name] = series
+    df = pd.DataFrame(cols)
+    df.index = pd.Index(df.pop('finals_row').to_numpy(dtype=np.int64))
+    return df
+
+def _finals_where(columns, league=None, group=None, uma=None, style=None, winners_only=False, known_style_only=False):
+    """SQL conditions and parameters for the query_finals filters (filters on absent columns are ignored)."""
+    clauses, params = [], []
+    for col, value in (('League', league), ('Finals_Group', group), ('Clean_Uma', uma), ('Clean_Style', style)):
+        if value is not None and col in columns:
+            clauses.append(f'"{col}" = ?'); params.append(value)
+    if winners_only and 'Is_Winner' in columns: clauses.append('"Is_Winner" = 1')
+    if known_style_only and 'Clean_Style' in columns: clauses.append('"Clean_Style" IS DISTINCT FROM \'Unknown\'')
+    return clauses, params
+
+def query_finals(config_item: dict, league=None, group=None, uma=None, style=None,
+                 winners_only=False, known_style_only=False) -> pd.DataFrame:
+    """
+    Rows of the merged finals frame matching every given filter (None = any), in frame order.
+    known_style_only drops rows whose Clean_Style is 'Unknown'. Served from the finals catalog;
+    falls back to filtering load_finals_data in pandas when the catalog can't be opened.
+    """
+    table = _finals_table(config_item)
+    if table is None:
+        df, _ = load_finals_data(config_item)
+        if df.empty:
+            return df
+        mask = pd.Series(True, index=df.index)
+        for col, value in (('League', league), ('Finals_Group', group), ('Clean_Uma', uma), ('Clean_Style', style)):
+            if value is not None and col in df.columns: mask &= df[col] == value
+        if winners_only and 'Is_Winner' in df.columns: mask &= df['Is_Winner'] == 1
+        if known_style_only and 'Clean_Style' in df.columns: mask &= df['Clean_Style'] != 'Unknown'
+        return df[mask].copy()
+
+    table, dtypes = table
+    clauses, params = _finals_where(dtypes, league, group, uma, style, winners_only, known_style_only)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    con = _finals_db()
+    try:
+        result = con.execute(f'SELECT * FROM "{table}" {where} ORDER BY finals_row', params).fetch_arrow_table()
+    finally:
+        con.close()
+    return _frame_from_arrow(result, dtypes)
+
+@st.cache_data(max_entries=32)
+def load_finals_slice(config_item: dict, league=None, group=None, uma=None, style=None,
+                      winners_only=False, known_style_only=False) -> pd.DataFrame:
+    """query_finals cached per filter combination, so reruns only unpickle the rows they show."""
+    return query_finals(config_item, league, group, uma, style, winners_only, known_style_only)
+
+def finals_values(config_item: dict, column: str, **filters) -> list:
+    """Sorted distinct non-null values of a finals column among rows matching `filters` (see query_finals)."""
+    table = _finals_table(config_item)
+    if table is None:
+        df = query_finals(config_item, **filters)
+        return sorted(df[column].dropna().unique()) if column in df.columns else []
+
+    table, dtypes = table
+    if column not in dtypes:
+        return []
+    clauses, params = _finals_where(dtypes, **filters)
+    clauses.insert(0, f'"{column}" IS NOT NULL')
+    con = _finals_db()
+    try:
+        rows = con.execute(f'SELECT DISTINCT "{column}" FROM "{table}" WHERE {" AND ".join(clauses)}', params).fetchall()
+    finally:
+        con.close()
+    return sorted(r[0] for r in rows)
+
 # --- VISUAL CARD RENDERER (Updated Layout) ---
 def render_visual_card_list(card_data, title="Top Cards", limit=10):
     """
@@ -1830,8 +3148,9 @@ def render_visual_card_list(card_data, title="Top Cards", limit=10):
         for col, (_, row) in zip(cols, batch.iterrows()):
             with col:
                 # 1. Card Image (Standard Streamlit Image works fine for local files)
-                card_img_path = f"assets/cards/{int(row['ID'])}.png"
-                if os.path.exists(card_img_path):
+                # A grid column is ~100px wide, so the 200px variant covers 2x screens
+                card_img_path = card_image_path(row['ID'], width=200)
+                if card_img_path:
                     st.image(card_img_path, width='stretch')
                 else:
                     st.warning(f"Missing: {row['ID']}")
@@ -1869,12 +3188,7 @@ def get_stat_icon_base64(stat_name):
     filename = f"{stat_name.lower()}_icon.png"
     # Adjust this path to match your project structure exactly
     path = os.path.join("assets", "card_type", filename)
-    
-    if os.path.exists(path):
-        with open(path, "rb") as f:
-            encoded = base64.b64encode(f.read()).decode()
-        return f"data:image/png;base64,{encoded}"
-    return "" # Return empty if not found (will fallback to text)
+    return image_src(path) # Empty if not found (will fallback to text)
 
 # Requires Pick Rate % and Win Rate %
 def add_img_chart(df, fig, opacity = 0.6, marker_opacity = 0.3):
@@ -1906,9 +3220,7 @@ def add_img_chart(df, fig, opacity = 0.6, marker_opacity = 0.3):
         for _, row in df.iterrows():
             uma_name = row['Clean_Uma']
             run_count = row['Runs']
-            img_src = get_uma_base64(uma_name)
-
-            circle_img = make_circle_image(img_src)
+            circle_img = get_uma_thumbnail_src(uma_name)
                         
             if circle_img:
                 ratio = run_count / max_runs
@@ -5,7 +5,7 @@ import pandas as pd
 from textwrap import dedent
 from collections import Counter
 from uma_utils import BUBBLE_CONFIG, get_card_rarity_map, render_visual_card_list, get_type_icon_src, get_uma_base64, get_stat_icon_base64, add_img_chart
-from uma_utils import load_finals_data
+from uma_utils import finals_values, load_finals_slice
 
 STAT_CHECKPOINTS = {
     'Speed':   { 600: "We be sandbagging", 800: "GOTTA GO FAST", 1000: "VROOOOOOM", 1200: "Speed Cap"},
@@ -253,9 +253,11 @@ def show_view(config_item):
     st.header(f"📊 {config_item['id']} - Championship Analysis")
     
     # Load Data
-    df, _ = load_finals_data(config_item) # Ignore raw_dfs
-    
-    if df.empty:
+    # Only the filter options and the selected League/Group slice are read from the finals
+    # catalog, instead of the whole merged frame on every rerun
+    available_leagues = finals_values(config_item, 'League')
+
+    if not available_leagues and not finals_values(config_item, 'Finals_Group'):
         st.warning("No analysis data available yet.")
         return
 
@@ -265,35 +267,25 @@ def show_view(config_item):
     with col1:
         # 1. LEAGUE FILTER (Graded / Open)
         # This comes first because A/B groups exist inside both leagues
-        if 'League' in df.columns:
-            # Determine available options dynamically
-            available_leagues = sorted(df['League'].dropna().unique())
-            
+        if available_leagues:
             # Default to Graded if it exists
             default_ix = available_leagues.index("Graded") if "Graded" in available_leagues else 0
             
             selected_league = st.radio("League", available_leagues, index=default_ix)
-            
-            # Filter the DataFrame immediately
-            df_league = df[df['League'] == selected_league].copy()
+            league_filter = selected_league
         else:
             # Fallback for legacy data
             selected_league = "Graded"
-            df_league = df
-
-        if df_league.empty:
-            st.warning(f"No data found for {selected_league} League.")
-            return
+            league_filter = None
     with col2:
         # 2. FINALS GROUP FILTER (A / B)
         # Only show groups that actually exist in the selected league
-        available_groups = sorted(df_league['Finals_Group'].dropna().unique())
+        available_groups = finals_values(config_item, 'Finals_Group', league=league_filter)
         
         if available_groups:
             default_idx = available_groups.index("A Finals") if "A Finals" in available_groups else 0
             selected_group = st.radio("Finals Group", available_groups, index=default_idx)
-            df_group = df_league[df_league['Finals_Group'] == selected_group].copy()
-            df_group = df_group[df_group['Clean_Style'] != 'Unknown']
+            df_group = load_finals_slice(config_item, league=league_filter, group=selected_group, known_style_only=True)
         else:
             st.warning("No groups found for this league.")
             df_group = pd.DataFrame()
@@ -386,7 +378,7 @@ def show_view(config_item):
                 win_rate = row['Win Rate']
                 
                 # 1. Get Image
-                img_src = get_uma_base64(uma_name)
+                img_src = get_uma_base64(uma_name, width=96) # 45px avatar, 2x for high-DPI
                 if not img_src:
                     img_tag = f"<div style='width: 45px; height: 45px; background: #333; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 20px;'>🐴</div>"
                 else:
@@ -443,7 +435,7 @@ def show_view(config_item):
             
             if not winners_df.empty:
                 # Get the Image Source (Base64)
-                img_src = get_uma_base64(selected_uma)
+                img_src = get_uma_base64(selected_uma, width=256) # faint radar background
 
                 # 2. Comparison Logic (Same as before)
                 stats = ['Speed', 'Stamina', 'Power', 'Guts', 'Wit']
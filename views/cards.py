@@ -31,7 +31,7 @@ def show_view(team_df):
     # If a user didn't answer, we assume they don't have the card (None)
     # We create a temporary copy so we don't mess up the main dataframe
     plot_df = team_df.copy()
-    plot_df[selected_col] = plot_df[selected_col].replace('Unknown', 'None')
+    plot_df[selected_col] = plot_df[selected_col].astype(object).replace('Unknown', 'None')
     plot_df[selected_col] = plot_df[selected_col].fillna('None')
     # ----------------------------------------
 
@@ -1,7 +1,7 @@
+import json
 import streamlit as st
-import base64
-import os
 from cm_config import CM_LIST
+from uma_utils import image_src, guide_tile_source
 
 def show_view(current_config):
     st.set_page_config(page_title="Moouma Guides", layout="wide")
@@ -52,25 +52,23 @@ def get_image_src(path):
     """
     Helper to get the correct source string for the HTML img tag.
     - If it's a URL, return it directly (Let the browser fetch it).
-    - If it's a local file, convert to Base64.
+    - If it's a local file, serve it as a static asset (or Base64 when static serving is off).
     """
     if path.startswith("http"):
         return path
-    
-    if os.path.exists(path):
-        with open(path, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            mime_type = "image/png" if path.endswith("png") else "image/jpeg"
-            return f"data:{mime_type};base64,{b64}"
-    return ""
-
-@st.cache_data
+    return image_src(path)
+
 def render_custom_viewer(path):
     """
     Renders a high-performance HTML/JS Image Viewer.
     Uses CSS Transforms for GPU-accelerated Pan/Zoom (No Lag).
+    Guides with a tile pyramid (`python etl.py tiles`) use the tiled viewer instead.
     """
+    tiles = guide_tile_source(path)
+    if tiles:
+        render_tiled_viewer(path, tiles)
+        return
+
     src = get_image_src(path)
     
     if not src:
@@ -182,4 +180,155 @@ def render_custom_viewer(path):
     """
     
     # Render the component with a fixed height of 750px
-    st.html(html_code, width = 'content', unsafe_allow_javascript=True)
\ No newline at end of file
+    st.html(html_code, width = 'content', unsafe_allow_javascript=True)
+
+def render_tiled_viewer(path, tiles):
+    """
+    Deep-zoom viewer for a tile pyramid (see uma_utils.guide_tile_source).
+    Shows one low-resolution level that fits the viewport first, then on every pan/zoom
+    only requests the tiles of the matching level that are actually on screen.
+    Mouse drag/wheel and touch drag/pinch are supported.
+    """
+    if path.startswith("http"):
+        st.link_button("🔍 Open Full Resolution Image (New Tab)", path)
+
+    st.caption("🖱️ **Controls:** Scroll or Pinch to Zoom • Click/Touch & Drag to Pan")
+
+    viewer_id = "dz-" + tiles['base'].rsplit('/', 1)[-1].replace('.', '-')
+
+    # --- TILED HTML/JS VIEWER ---
+    html_code = f"""
+    <div id="{viewer_id}" style="position: relative; width: 100%; height: 750px; overflow: hidden; cursor: grab;
+         touch-action: none; background-color: #0e1117; border: 1px solid #333; border-radius: 5px;">
+        <div class="dz-layer" style="position: absolute; left: 0; top: 0; transform-origin: 0 0; will-change: transform;"></div>
+    </div>
+    <script>
+    (() => {{
+        const info = {json.dumps(tiles)};
+        const root = document.getElementById("{viewer_id}");
+        const layer = root.querySelector('.dz-layer');
+        const T = info.tile_size, OV = info.overlap;
+        const loaded = new Map();  // "level/col_row" -> <img>
+
+        let fitScale = 1, scale = 1, x = 0, y = 0, baseLevel = info.min_level, queued = false;
+
+        // Highest-detail level needed for the current on-screen scale
+        function levelFor(s) {{
+            const level = info.max_level + Math.ceil(Math.log2(s * (window.devicePixelRatio || 1)));
+            return Math.min(info.max_level, Math.max(info.min_level, level));
+        }}
+
+        function tileSpan(index, levelSize) {{
+            // Pixel offset and size of a tile within its level, including the overlap border
+            const from = Math.max(0, index * T - OV);
+            return [from, Math.min(levelSize, (index + 1) * T + OV) - from];
+        }}
+
+        function addTile(level, col, row, keep) {{
+            const key = level + "/" + col + "_" + row;
+            keep.add(key);
+            if (loaded.has(key)) return;
+            const f = Math.pow(2, info.max_level - level);
+            const [left, w] = tileSpan(col, Math.ceil(info.width / f));
+            const [top, h] = tileSpan(row, Math.ceil(info.height / f));
+            const img = document.createElement('img');
+            img.draggable = false;
+            img.style.cssText = `position: absolute; left: ${{left * f}}px; top: ${{top * f}}px; ` +
+                                `width: ${{w * f}}px; height: ${{h * f}}px; z-index: ${{level}}; max-width: none;`;
+            img.src = `${{info.base}}/${{level}}/${{col}}_${{row}}.${{info.ext}}`;
+            layer.appendChild(img);
+            loaded.set(key, img);
+        }}
+
+        function addVisible(level, keep) {{
+            const f = Math.pow(2, info.max_level - level);
+            const cols = Math.ceil(Math.ceil(info.width / f) / T), rows = Math.ceil(Math.ceil(info.height / f) / T);
+            const span = T * f * scale;
+            const c0 = Math.max(0, Math.floor(-x / span)), c1 = Math.min(cols - 1, Math.floor((root.clientWidth - x) / span));
+            const r0 = Math.max(0, Math.floor(-y / span)), r1 = Math.min(rows - 1, Math.floor((root.clientHeight - y) / span));
+            for (let c = c0; c <= c1; c++) for (let r = r0; r <= r1; r++) addTile(level, c, r, keep);
+        }}
+
+        function update() {{
+            queued = false;
+            layer.style.transform = `translate(${{x}}px, ${{y}}px) scale(${{scale}})`;
+            const keep = new Set();
+            // The fit-to-view level stays loaded everywhere as a backdrop while sharper tiles arrive
+            const f = Math.pow(2, info.max_level - baseLevel);
+            for (let c = 0; c < Math.ceil(Math.ceil(info.width / f) / T); c++)
+                for (let r = 0; r < Math.ceil(Math.ceil(info.height / f) / T); r++) addTile(baseLevel, c, r, keep);
+            const level = levelFor(scale);
+            if (level > baseLevel) addVisible(level, keep);
+            for (const [key, img] of loaded) {{
+                if (!keep.has(key)) {{ img.remove(); loaded.delete(key); }}
+            }}
+        }}
+
+        function schedule() {{
+            if (!queued) {{ queued = true; requestAnimationFrame(update); }}
+        }}
+
+        function zoomAt(px, py, factor) {{
+            const next = Math.min(Math.max(fitScale * 0.5, scale * factor), fitScale * 10); // Min 0.5x, Max 10x
+            x = px - (px - x) * next / scale;
+            y = py - (py - y) * next / scale;
+            scale = next;
+            schedule();
+        }}
+
+        // Pointer events cover mouse and touch; two active pointers pinch-zoom
+        const pointers = new Map();
+        let pinchDist = 0;
+        root.addEventListener('pointerdown', (e) => {{
+            root.setPointerCapture(e.pointerId);
+            pointers.set(e.pointerId, [e.clientX, e.clientY]);
+            root.style.cursor = 'grabbing';
+        }});
+        root.addEventListener('pointermove', (e) => {{
+            const prev = pointers.get(e.pointerId);
+            if (!prev) return;
+            pointers.set(e.pointerId, [e.clientX, e.clientY]);
+            if (pointers.size === 1) {{
+                x += e.clientX - prev[0];
+                y += e.clientY - prev[1];
+                schedule();
+            }} else if (pointers.size === 2) {{
+                const [a, b] = [...pointers.values()];
+                const dist = Math.hypot(a[0] - b[0], a[1] - b[1]);
+                const rect = root.getBoundingClientRect();
+                if (pinchDist) zoomAt((a[0] + b[0]) / 2 - rect.left, (a[1] + b[1]) / 2 - rect.top, dist / pinchDist);
+                pinchDist = dist;
+            }}
+        }});
+        const release = (e) => {{
+            pointers.delete(e.pointerId);
+            pinchDist = 0;
+            if (!pointers.size) root.style.cursor = 'grab';
+        }};
+        root.addEventListener('pointerup', release);
+        root.addEventListener('pointercancel', release);
+
+        root.addEventListener('wheel', (e) => {{
+            e.preventDefault();
+            const rect = root.getBoundingClientRect();
+            zoomAt(e.clientX - rect.left, e.clientY - rect.top, e.deltaY < 0 ? 1.1 : 1 / 1.1);
+        }}, {{ passive: false }});
+
+        // Initial view: whole guide fitted and centred (once the container has been laid out)
+        function init() {{
+            fitScale = Math.min(root.clientWidth / info.width, root.clientHeight / info.height) * 0.95;
+            scale = fitScale;
+            x = (root.clientWidth - info.width * scale) / 2;
+            y = (root.clientHeight - info.height * scale) / 2;
+            baseLevel = levelFor(fitScale);
+            update();
+        }}
+        if (root.clientWidth) init();
+        else new ResizeObserver((_, observer) => {{
+            if (root.clientWidth) {{ observer.disconnect(); init(); }}
+        }}).observe(root);
+    }})();
+    </script>
+    """
+
+    st.html(html_code, width = 'stretch', unsafe_allow_javascript=True)
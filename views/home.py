@@ -90,7 +90,7 @@ def show_view(df, team_df, current_config):
 
     # --- 1. PREPARE DATA ---
     # Group by Round/Day/Style and count entries
-    daily_style = df.groupby(['Round', 'Day', 'Clean_Style']).size().reset_index(name='Count')
+    daily_style = df.groupby(['Round', 'Day', 'Clean_Style'], observed=True).size().reset_index(name='Count')
 
     # Create a 'Session' column for the X-Axis (e.g., "Round 1 - Day 1")
     daily_style['Session'] = daily_style['Round'].astype(str) + " - " + daily_style['Day'].astype(str)
@@ -124,7 +124,7 @@ def show_view(df, team_df, current_config):
     filtered_df = df[df['Clean_Uma'].isin(top_umas)]
 
     # --- 2. PREPARE DATA ---
-    daily_uma = filtered_df.groupby(['Round', 'Day', 'Clean_Uma']).size().reset_index(name='Count')
+    daily_uma = filtered_df.groupby(['Round', 'Day', 'Clean_Uma'], observed=True).size().reset_index(name='Count')
     daily_uma['Session'] = daily_uma['Round'].astype(str) + " - " + daily_uma['Day'].astype(str)
 
     # --- 3. PLOT STACKED BAR CHART ---
@@ -150,8 +150,8 @@ def show_view(df, team_df, current_config):
     with t1:
         # 1. Win Rate Trend
         if 'Round' in df.columns and 'Day' in df.columns:
-            trend_df = team_df.groupby(['Round', 'Day']).agg({'Calculated_WinRate': 'mean'}).reset_index()
-            trend_df['Session'] = trend_df['Round'] + " " + trend_df['Day']
+            trend_df = team_df.groupby(['Round', 'Day'], observed=True).agg({'Calculated_WinRate': 'mean'}).reset_index()
+            trend_df['Session'] = trend_df['Round'].astype(str) + " " + trend_df['Day'].astype(str)
             wr_order = ["R1 D1", "R1 D2", "R2 D1", "R2 D2"]
 
             fig_trend = px.line(
@@ -194,7 +194,7 @@ def show_view(df, team_df, current_config):
         st.plotly_chart(style_fig(fig_dist, height=350), width="stretch", config=PLOT_CONFIG)
     with g2:
         # Aggregate both Win Rate (Mean) and Races (Sum)
-        group_stats = team_df.groupby('Clean_Group').agg({
+        group_stats = team_df.groupby('Clean_Group', observed=True).agg({
             'Calculated_WinRate': 'mean', 
             'Clean_Races': 'sum'
         }).reset_index()
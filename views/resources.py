@@ -18,7 +18,7 @@ def show_view(df, team_df):
             
             # 1. AGGREGATE MEAN WR AND PLAYER COUNT
             # We count 'Clean_IGN' to see how many players are in each category
-            card_stats = df.drop_duplicates(subset=['Clean_IGN', 'Round', 'Day']).groupby(col_match).agg({
+            card_stats = df.drop_duplicates(subset=['Clean_IGN', 'Round', 'Day']).groupby(col_match, observed=True).agg({
                 'Calculated_WinRate': 'mean',
                 'Clean_IGN': 'count'
             }).reset_index().rename(columns={'Clean_IGN': 'Player_Count'})
@@ -75,8 +75,8 @@ def show_view(df, team_df):
 
     st.subheader("Meta Trends (Round 1 vs Round 2)")
     if 'Round' in df.columns and 'Day' in df.columns:
-        trend_df = team_df.groupby(['Round', 'Day']).agg({'Calculated_WinRate': 'mean', 'Clean_Races': 'count'}).reset_index()
-        trend_df['Session'] = trend_df['Round'] + " " + trend_df['Day']
+        trend_df = team_df.groupby(['Round', 'Day'], observed=True).agg({'Calculated_WinRate': 'mean', 'Clean_Races': 'count'}).reset_index()
+        trend_df['Session'] = trend_df['Round'].astype(str) + " " + trend_df['Day'].astype(str)
         
         fig_trend = px.line(
             trend_df, x='Session', y='Calculated_WinRate', title="Global Win Rate Trend",
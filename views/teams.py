@@ -23,7 +23,7 @@ def show_view(df, team_df):
         st.subheader("🏆 Meta Team Compositions")
         if not filtered_team_df.empty:
             # 1. PREPARE DATA
-            comp_stats = filtered_team_df.groupby('Team_Comp').agg({
+            comp_stats = filtered_team_df.groupby('Team_Comp', observed=True).agg({
                 'Calculated_WinRate': 'mean', 
                 'Clean_Races': 'count' # Count of Sessions
             }).reset_index().rename(columns={'Clean_Races': 'Entries'})
@@ -225,16 +225,16 @@ def show_view(df, team_df):
         
         if top_teams:
             # 1. Get Daily Totals (For % Calculation)
-            daily_totals = team_df.groupby(['Round', 'Day']).size().reset_index(name='Total_Daily_Sessions')
+            daily_totals = team_df.groupby(['Round', 'Day'], observed=True).size().reset_index(name='Total_Daily_Sessions')
             
             # 2. Filter & Group Specific Teams
             evo_df = team_df[team_df['Team_Comp'].isin(top_teams)]
-            evo_stats = evo_df.groupby(['Round', 'Day', 'Team_Comp']).size().reset_index(name='Count')
+            evo_stats = evo_df.groupby(['Round', 'Day', 'Team_Comp'], observed=True).size().reset_index(name='Count')
             
             # 3. Merge to calculate Percentage
             evo_stats = evo_stats.merge(daily_totals, on=['Round', 'Day'])
             evo_stats['Pick_Rate'] = (evo_stats['Count'] / evo_stats['Total_Daily_Sessions']) * 100
-            evo_stats['Session'] = evo_stats['Round'] + ' ' + evo_stats['Day']
+            evo_stats['Session'] = evo_stats['Round'].astype(str) + ' ' + evo_stats['Day'].astype(str)
             
             # 4. Plot
             fig_evo = px.line(
@@ -46,7 +46,7 @@ def show_view(df, team_df):
         # -----------------------------------------------
 
         # 1. PREPARE DATA: Aggregate by Summing Races (True Volume)
-        strat_stats = uma_data.groupby('Clean_Style').agg({
+        strat_stats = uma_data.groupby('Clean_Style', observed=True).agg({
             'Calculated_WinRate': 'mean',
             'Clean_Races': 'sum' 
         }).reset_index()
@@ -83,7 +83,7 @@ def show_view(df, team_df):
     st.subheader("Uma Tier List")
     
     # Aggregate Stats
-    uma_stats = df.groupby('Clean_Uma').agg({
+    uma_stats = df.groupby('Clean_Uma', observed=True).agg({
         'Calculated_WinRate': 'mean', 
         'Clean_Races': 'count'
     }).reset_index()